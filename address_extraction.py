@@ -0,0 +1,84 @@
+# address_extraction.py
+import hashlib
+import re
+from typing import Callable, Dict, List, Optional
+
+from ttl_cache import TTLCache
+
+EXTRACTION_CACHE_SIZE = 512
+EXTRACTION_TTL        = 24 * 3600  # seconds
+
+# English suffixes follow the street name, French street types precede it
+# ("123 Main St", "456 Rue Example"); both sit within a few words of a civic number.
+_STREET_WORDS = (
+    "st", "street", "ave", "av", "avenue", "rd", "road", "blvd", "boul", "boulevard",
+    "dr", "drive", "ln", "lane", "way", "ct", "court", "pl", "place", "sq", "square",
+    "ter", "terrace", "pkwy", "parkway", "hwy", "highway", "cir", "circle", "cres",
+    "crescent", "trl", "trail", "row", "loop", "aly", "alley", "plz", "plaza",
+    "rue", "chemin", "ch", "route", "rte", "rang", "montée", "côte", "allée", "quai",
+    "promenade",
+)
+_STREET_ADDRESS = re.compile(
+    r"\b\d{1,6}[a-z]?(?:-\d{1,6})?,?\s+(?:[^\W\d_][\w'.-]*\s+){0,4}"
+    r"(?:" + "|".join(_STREET_WORDS) + r")\b",
+    re.IGNORECASE,
+)
+_POSTAL_CODE = re.compile(
+    r"\b\d{5}(?:-\d{4})?\b"                         # US ZIP / ZIP+4
+    r"|\b[abceghj-nprstvxy]\d[a-z][ -]?\d[a-z]\d\b"  # Canadian postal code
+    r"|\bp\.?\s?o\.?\s+box\b",
+    re.IGNORECASE,
+)
+
+_cache = TTLCache(maxsize=EXTRACTION_CACHE_SIZE, ttl=EXTRACTION_TTL)
+_stats = {"calls": 0, "cache_hits": 0, "prefilter_skips": 0, "llm_calls": 0}
+
+
+def looks_like_address(text: str) -> bool:
+    """
+    Cheap local check: False only when `text` has neither a civic number near a
+    street word nor a postal code, i.e. when it clearly contains no address.
+    """
+    return bool(text) and bool(_STREET_ADDRESS.search(text) or _POSTAL_CODE.search(text))
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def extract_addresses_cached(
+    text: str,
+    extract: Callable[[str], Optional[List[str]]],
+) -> List[str]:
+    """
+    Addresses found in `text`, memoized on a hash of the text. `extract` (the
+    LLM call) only runs when the text passes looks_like_address() and has not
+    been seen before; it returns None on failure, which is not cached.
+    """
+    _stats["calls"] += 1
+    key = text_key(text)
+    hit = _cache.get(key)
+    if hit is not None:
+        _stats["cache_hits"] += 1
+        return list(hit)
+
+    if not looks_like_address(text):
+        _stats["prefilter_skips"] += 1
+        _cache.set(key, [])
+        return []
+
+    _stats["llm_calls"] += 1
+    found = extract(text)
+    if found is None:
+        return []
+    _cache.set(key, list(found))
+    return list(found)
+
+
+def extraction_stats() -> Dict[str, int]:
+    """Counters of the extraction layer; llm_calls_avoided = cache hits + prefilter skips."""
+    return {
+        **_stats,
+        "llm_calls_avoided": _stats["cache_hits"] + _stats["prefilter_skips"],
+        "cache_size":        len(_cache),
+    }
@@ -0,0 +1,111 @@
+# benchmarks/bench_flexpolyline.py
+"""
+Compare the per-character flexpolyline encoder/decoder with the vectorized
+encode_array()/decode_array(), after checking they produce identical output.
+
+    python benchmarks/bench_flexpolyline.py [n_points]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flexpolyline import ABSENT, ELEVATION, THIRD_DIM_MAP, decode, decode_array, encode, encode_array
+
+
+def synthetic_route(n_points, third_dim=ABSENT, seed=42):
+    """Random walk around Manhattan, roughly shaped like a long truck route."""
+    rng = random.Random(seed)
+    lat, lng, z = 40.75, -73.98, 10.0
+    points = []
+    for _ in range(n_points):
+        lat += rng.uniform(-0.0005, 0.0005)
+        lng += rng.uniform(-0.0005, 0.0005)
+        z   += rng.uniform(-1.0, 1.0)
+        points.append((lat, lng, z) if third_dim else (lat, lng))
+    return points
+
+
+def check_encode_array(trials=500, seed=7):
+    """
+    Round-trip property check: for random coordinates, precisions and every
+    THIRD_DIM_MAP type, encode_array() must be byte-identical to encode()
+    and decode back bit-identically to decode().
+    """
+    rng = random.Random(seed)
+    for _ in range(trials):
+        third_dim = rng.choice([ABSENT] + sorted(THIRD_DIM_MAP))
+        precision, z_precision = rng.randint(0, 9), rng.randint(0, 9)
+        points = [
+            (rng.uniform(-90, 90), rng.uniform(-180, 180), rng.uniform(-1000, 1000))
+            for _ in range(rng.randint(0, 200))
+        ]
+        if rng.random() < 0.3:  # exact .5 values exercise round-half-even ties
+            points = [tuple(round(v * 2) / 2 for v in p) for p in points]
+        expected = encode(points, precision, third_dim, z_precision)
+        actual = encode_array(np.asarray(points).reshape(-1, 3), precision, third_dim, z_precision)
+        if actual != expected:
+            raise AssertionError(f"encode_array() differs from encode() (third_dim={third_dim})")
+        decoded = np.asarray(decode(expected), dtype=np.float64).reshape(-1, 3 if third_dim else 2)
+        if decode_array(expected).tobytes() != decoded.tobytes():
+            raise AssertionError(f"decode_array() differs from decode() (third_dim={third_dim})")
+
+
+def best_of(func, repeat=5):
+    number = 1
+    while timeit.timeit(func, number=number) < 0.2:
+        number *= 2
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def run(n_points):
+    check_encode_array()
+    results = []
+    for third_dim in (ABSENT, ELEVATION):
+        points = synthetic_route(n_points, third_dim)
+        array = np.asarray(points)
+        encoded = encode(points, precision=5, third_dim=third_dim, third_dim_precision=1)
+
+        t_encode       = best_of(lambda: encode(points, 5, third_dim, 1))
+        t_encode_array = best_of(lambda: encode_array(array, 5, third_dim, 1))
+        t_decode       = best_of(lambda: decode(encoded))
+        t_decode_array = best_of(lambda: decode_array(encoded))
+        results.append({
+            "third_dim":       third_dim,
+            "points":          n_points,
+            "chars":           len(encoded),
+            "encode_ms":       t_encode * 1e3,
+            "encode_array_ms": t_encode_array * 1e3,
+            "decode_ms":       t_decode * 1e3,
+            "decode_array_ms": t_decode_array * 1e3,
+        })
+    return results
+
+
+def bench(quick: bool = False) -> list:
+    """run() as run_benchmarks.py results, one per operation and third dimension."""
+    out = []
+    for r in run(5_000 if quick else 50_000):
+        for op in ("encode", "encode_array", "decode", "decode_array"):
+            out.append({
+                "name":      f"flexpolyline.{op}_{'3d' if r['third_dim'] else '2d'}",
+                "median_ms": r[f"{op}_ms"],
+                "points":    r["points"],
+                "chars":     r["chars"],
+            })
+    return out
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    for r in run(n):
+        print(
+            f"third_dim={r['third_dim']} points={r['points']} chars={r['chars']}: "
+            f"encode {r['encode_ms']:.2f} ms vs encode_array {r['encode_array_ms']:.2f} ms "
+            f"(x{r['encode_ms'] / r['encode_array_ms']:.1f}), "
+            f"decode {r['decode_ms']:.2f} ms vs decode_array {r['decode_array_ms']:.2f} ms "
+            f"(x{r['decode_ms'] / r['decode_array_ms']:.1f})"
+        )
@@ -0,0 +1,111 @@
+# benchmarks/bench_here.py
+"""
+HERE clients against the StubServer: parallel geocoding (geocode_many),
+block-wise matrix routing (matrix_routes) and the batch geocoding job mode
+(run_batch_geocode). Checks first that both pools work with tracing on, where
+each pool task runs in its own bound context, and that a batch job is
+submitted, polled and read back correctly.
+
+    python benchmarks/bench_here.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes
+from harness import failed, measure, report
+
+fakes.install()
+
+import tracing
+from call_here_api import (
+    MATRIX_MAX_DESTINATIONS,
+    MATRIX_MAX_ORIGINS,
+    geocode_many,
+    matrix_routes,
+    run_batch_geocode,
+)
+
+ADDRESSES = [f"{100 + i} Main St, Springfield, IL 62701" for i in range(8)]
+
+
+def _grid(n: int, lat: float = 39.78, lon: float = -89.65):
+    return [(lat + (i % 10) * 0.01, lon + (i // 10) * 0.01) for i in range(n)]
+
+
+def check_traced_pools() -> None:
+    """
+    With a Trace installed, geocode_many() and a multi-block matrix_routes()
+    must answer every address and block, and each request must leave one span.
+    """
+    import numpy as np
+
+    origins, destinations = _grid(MATRIX_MAX_ORIGINS + 1), _grid(MATRIX_MAX_DESTINATIONS + 1)
+    tracing.start_rerun(page="bench")
+    try:
+        geocoded = geocode_many(ADDRESSES)
+        times, _ = matrix_routes(origins, destinations)
+    finally:
+        trace = tracing.finish_rerun()
+    missing = [a for a, geo in geocoded.items() if geo is None]
+    if missing:
+        raise AssertionError(f"geocode_many() failed for {len(missing)}/{len(ADDRESSES)} addresses with tracing on")
+    if np.isnan(times).any():
+        raise AssertionError("matrix_routes() left blocks unanswered with tracing on")
+    spans = [s.name for s in trace.spans]
+    if spans.count("here.geocode") != len(ADDRESSES) or spans.count("here.matrix") != 4:
+        raise AssertionError(f"unexpected spans with tracing on: {sorted(set(spans))}")
+
+
+def check_batch_geocode(stub: fakes.StubServer) -> None:
+    """
+    run_batch_geocode() must poll until the job completes and map every matched
+    record back to its address; an unmatched record is left out.
+    """
+    unmatched = f"1 {fakes.STUB_UNMATCHED.title()} Rd"
+    addresses = ADDRESSES + [unmatched, ADDRESSES[0]]   # duplicates are submitted once
+    result = run_batch_geocode(addresses, poll_interval=0.01, timeout=10)
+    expected = {a: fakes.stub_position(a) for a in ADDRESSES}
+    if result != expected:
+        raise AssertionError(f"run_batch_geocode() returned {len(result)} rows, expected {len(expected)}: "
+                             f"{sorted(set(result) ^ set(expected))[:3]}")
+    job = list(stub.jobs.values())[-1]
+    if len(job["records"]) != len(ADDRESSES) + 1 or job["polls"] < 2:
+        raise AssertionError(f"unexpected batch job: {len(job['records'])} records, {job['polls']} status polls")
+
+
+def bench(quick: bool = False) -> list:
+    repeat = 3 if quick else 5
+    names  = ["here.geocode_many_8", "here.geocode_many_8_traced", "here.matrix_4_blocks",
+              "here.batch_geocode_200"]
+    batch  = [f"{i} Elm St, Springfield, IL 62702" for i in range(200)]
+    origins, destinations = _grid(MATRIX_MAX_ORIGINS + 1), _grid(MATRIX_MAX_DESTINATIONS + 1)
+
+    def traced_geocode():
+        tracing.start_rerun(page="bench")
+        try:
+            geocode_many(ADDRESSES)
+        finally:
+            tracing.finish_rerun()
+
+    with fakes.StubServer() as stub:
+        fakes.point_apis_at(stub.url)
+        try:
+            check_traced_pools()
+            check_batch_geocode(stub)
+        except Exception as e:
+            return [failed(name, f"{type(e).__name__}: {e}") for name in names]
+        return [
+            measure(names[0], lambda: geocode_many(ADDRESSES), repeat, addresses=len(ADDRESSES)),
+            measure(names[1], traced_geocode, repeat, addresses=len(ADDRESSES)),
+            measure(names[2], lambda: matrix_routes(origins, destinations), repeat,
+                    origins=len(origins), destinations=len(destinations)),
+            measure(names[3], lambda: run_batch_geocode(batch, poll_interval=0), repeat,
+                    addresses=len(batch)),
+        ]
+
+
+if __name__ == "__main__":
+    report(bench())
@@ -0,0 +1,97 @@
+# benchmarks/bench_pages.py
+"""
+End-to-end timing of each page of streamlit_app.main(), run headless with
+streamlit.testing AppTest against the fakes: FakeSession for Snowflake,
+FakeSnowflake for Cortex and a StubServer for HERE and Precisely. Only the
+app's own work is measured (the stand-ins answer instantly unless given a
+latency).
+
+    python benchmarks/bench_pages.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes
+from harness import REPO_DIR, failed, measure_runs, report, skipped
+
+APP_FILE     = os.path.join(REPO_DIR, "streamlit_app.py")
+PAGE_TIMEOUT = 60  # seconds per AppTest run
+
+AGENT_QUESTION   = "Which deal stages carry the most value this quarter?"
+ADDRESS_QUESTION = "Show demographics for 1200 Main St, Springfield, IL 62701"
+ROUTE_QUESTION   = "Route between 1200 Main St, Springfield, IL 62701 and 45 Oak Ave, Springfield, IL 62704"
+
+
+def _app(page: str, **state):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_FILE, default_timeout=PAGE_TIMEOUT)
+    at.session_state["page"] = page
+    for key, value in state.items():
+        at.session_state[key] = value
+    return at
+
+
+def _run(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"page raised: {at.exception[0].message}")
+    return at
+
+
+def _ask(question: str):
+    """Render Prospecting (untimed), then time typing `question` and pressing Send."""
+    def setup():
+        return _run(_app("Prospecting"))
+
+    def ask(at):
+        at.text_input(key="chat_input").set_value(question)
+        at.button(key="chat_send").click()
+        _run(at)
+
+    return setup, ask
+
+
+SCENARIOS = {
+    "page.customers":           (lambda: _app("Customers list"), _run),
+    "page.new_requests":        (lambda: _app("New requests"), _run),
+    "page.new_requests_email":  (lambda: _app("New requests", selected_email_id="msg-00050"), _run),
+    "page.prospecting_agent":   _ask(AGENT_QUESTION),
+    "page.prospecting_address": _ask(ADDRESS_QUESTION),
+    "page.prospecting_route":   _ask(ROUTE_QUESTION),
+}
+
+
+def bench(quick: bool = False) -> list:
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError as e:
+        return [skipped(name, f"streamlit is not installed ({e})") for name in SCENARIOS]
+
+    session, snowflake = fakes.install()
+    repeat  = 3 if quick else 5
+    results = []
+    with fakes.StubServer() as stub:
+        try:
+            fakes.point_apis_at(stub.url)
+        except ImportError as e:
+            return [skipped(name, f"app modules cannot be imported ({e})") for name in SCENARIOS]
+        for name, (setup, run) in SCENARIOS.items():
+            q0, c0, h0 = session.queries, snowflake.calls, sum(stub.hits.values())
+            try:
+                r = measure_runs(name, run, repeat, setup=setup)
+            except Exception as e:
+                results.append(failed(name, f"{type(e).__name__}: {e}"))
+                continue
+            r["sql_queries"] = session.queries - q0
+            r["cortex_calls"] = snowflake.calls - c0
+            r["http_calls"] = sum(stub.hits.values()) - h0
+            results.append(r)
+    return results
+
+
+if __name__ == "__main__":
+    report(bench())
@@ -0,0 +1,92 @@
+# benchmarks/bench_parsing.py
+"""
+Micro-benchmarks of the response parsers: agent SSE events
+(process_sse_response), HERE route JSON (decode_polyline /
+decode_polyline_array) and COMPLETE envelopes of bin requests.
+
+    python benchmarks/bench_parsing.py
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes
+from harness import measure, report
+
+fakes.install()
+
+from bench_flexpolyline import synthetic_route
+from bin_request_retrieval import build_bin_request, parse_completion_envelope
+from call_here_api import decode_polyline, decode_polyline_array
+from flexpolyline import encode
+
+try:
+    from streamlit_app import process_sse_response
+    SSE_TARGET = "streamlit_app.process_sse_response"
+except ImportError:
+    # streamlit is not installed: time the same parser behind it
+    from sse_stream import AgentStream
+
+    def process_sse_response(events):
+        stream = AgentStream(events).consume()
+        return stream.text, stream.sql.strip(), stream.citations
+
+    SSE_TARGET = "sse_stream.AgentStream (streamlit not installed)"
+
+
+def here_route_json(sections: int = 3, points: int = 2_000) -> dict:
+    """A Routing v8 response with `sections` polylines of `points` vertices each."""
+    route = synthetic_route(sections * points)
+    return {"routes": [{"sections": [
+        {"polyline": encode(route[i * points:(i + 1) * points], precision=5),
+         "summary": {"length": 10_000, "duration": 900}}
+        for i in range(sections)
+    ]}]}
+
+
+def completion_envelope(i: int) -> str:
+    """A SNOWFLAKE.CORTEX.COMPLETE result as stored in FULL_RESPONSE."""
+    inner = json.dumps({
+        "container_format": "20-yard roll-off", "quantity": str(1 + i % 4),
+        "date_needed": "2025-08-15", "requester": f"Requester {i}",
+    })
+    return json.dumps({
+        "choices": [{"messages": inner}],
+        "created": 1754000000,
+        "model": "claude-4-sonnet",
+        "usage": {"completion_tokens": 48, "prompt_tokens": 210, "total_tokens": 258},
+    })
+
+
+def bench(quick: bool = False) -> list:
+    repeat  = 3 if quick else 5
+    results = []
+
+    for chunks in (40, 400):
+        events  = fakes.agent_events(text_chunks=chunks)
+        content = json.dumps(events)
+        results.append(measure(f"sse.events_{chunks}", lambda: process_sse_response(events),
+                               repeat, target=SSE_TARGET, events=len(events)))
+        results.append(measure(f"sse.buffered_content_{chunks}", lambda: process_sse_response(content),
+                               repeat, target=SSE_TARGET, bytes=len(content)))
+
+    route = here_route_json()
+    results.append(measure("here.decode_polyline", lambda: decode_polyline(route), repeat,
+                           points=6_000))
+    results.append(measure("here.decode_polyline_array", lambda: decode_polyline_array(route), repeat,
+                           points=6_000))
+
+    envelopes = [completion_envelope(i) for i in range(100)]
+    results.append(measure(
+        "bin_request.envelope_x100",
+        lambda: [build_bin_request(f"msg-{i}", "", parse_completion_envelope(e)) for i, e in enumerate(envelopes)],
+        repeat,
+    ))
+    return results
+
+
+if __name__ == "__main__":
+    report(bench())
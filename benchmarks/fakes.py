@@ -0,0 +1,506 @@
+# benchmarks/fakes.py
+"""
+Local stand-ins that let the app modules run outside Snowflake:
+
+- FakeSnowflake: the `_snowflake` module (secrets, and send_snow_api_request
+  replaying canned Cortex agent / completion SSE payloads)
+- FakeSession: a Snowpark session answering the app's queries from an
+  in-memory dataset (FakeData)
+- StubServer: HERE geocode / batch geocode jobs / routing / matrix and
+  Precisely token / demographics endpoints on 127.0.0.1
+
+install() must run before any app module is imported; point_apis_at() then
+redirects the HTTP clients to a running StubServer.
+"""
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# ── Cortex agent payloads ──────────────────────────────────────────────────
+
+AGENT_SQL = (
+    "SELECT deal_stage, COUNT(*) AS deals, SUM(deal_value) AS total_value "
+    "FROM sales_metrics GROUP BY deal_stage ORDER BY total_value DESC"
+)
+
+
+def _delta(*content) -> Dict:
+    return {"event": "message.delta", "data": {"delta": {"content": list(content)}}}
+
+
+def agent_events(
+    text_chunks: int = 40,
+    sql: Optional[str] = AGENT_SQL,
+    citations: int = 3,
+    seed: int = 11,
+) -> List[Dict]:
+    """
+    Events shaped like a two-tool agent response: the answer text in
+    `text_chunks` deltas, then one Analyst result carrying `sql` and one
+    Search result with `citations` hits.
+    """
+    rng = random.Random(seed)
+    words = ["deal", "pipeline", "quarter", "closed", "renewal", "bin", "route", "customer"]
+    events = [{"event": "response.status", "data": {"status": "planning"}}]
+    for _ in range(text_chunks):
+        events.append(_delta({"type": "text", "text": " ".join(rng.choices(words, k=6)) + " "}))
+    if sql:
+        events.append(_delta({"type": "tool_results", "tool_results": {"content": [
+            {"type": "json", "json": {"text": "Interpreted as deals by stage.", "sql": sql}},
+        ]}}))
+    if citations:
+        events.append(_delta({"type": "tool_results", "tool_results": {"content": [
+            {"type": "json", "json": {"searchResults": [
+                {"source_id": f"Call with customer {i}", "doc_id": f"CONV{i:04d}"}
+                for i in range(citations)
+            ]}},
+        ]}}))
+    events.append({"event": "done", "data": "[DONE]"})
+    return events
+
+
+def address_events(addresses: Iterable[str]) -> List[Dict]:
+    """Events of an address-extraction reply: the JSON array as answer text."""
+    return [_delta({"type": "text", "text": json.dumps(list(addresses))})]
+
+
+def _default_responder(body: Dict) -> List[Dict]:
+    prompt = " ".join(
+        c.get("text", "")
+        for m in body.get("messages", [])
+        for c in m.get("content", [])
+        if c.get("type") == "text"
+    )
+    if prompt.startswith("Extract every full street address"):
+        found = re.findall(r"\d+ [A-Z][^\n`]*?, [A-Z]{2} \d{5}", prompt.split("Text:", 1)[-1])
+        return address_events(found)
+    if body.get("tools"):
+        return agent_events()
+    return agent_events(sql=None, citations=0)
+
+
+class FakeSnowflake(types.ModuleType):
+    """The `_snowflake` module of Streamlit in Snowflake."""
+
+    def __init__(
+        self,
+        responder: Callable[[Dict], List[Dict]] = _default_responder,
+        latency: float = 0.0,
+        secret_latency: float = 0.0,
+    ):
+        super().__init__("_snowflake")
+        self.responder      = responder
+        self.latency        = latency
+        self.secret_latency = secret_latency
+        self.calls          = 0
+        self.secret_reads   = 0
+
+    def get_generic_secret_string(self, name: str) -> str:
+        self.secret_reads += 1
+        if self.secret_latency:
+            time.sleep(self.secret_latency)
+        return f"fake-{name}"
+
+    def send_snow_api_request(self, method, path, headers, params, body, request_guid, timeout):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {"status": 200, "content": json.dumps(self.responder(body or {}))}
+
+
+# ── Snowpark session ───────────────────────────────────────────────────────
+
+class FakeRow:
+    """Snowpark Row look-alike: row["COL"], row[0], row.COL, as_dict()."""
+
+    __slots__ = ("_d",)
+
+    def __init__(self, d: Dict[str, Any]):
+        self._d = d
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self._d.values())[key]
+        if key in self._d:
+            return self._d[key]
+        for k, v in self._d.items():
+            if k.upper() == str(key).upper():
+                return v
+        raise KeyError(key)
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self._d)
+
+
+class FakeDataFrame:
+    def __init__(self, rows: List[Dict[str, Any]], columns: Optional[List[str]] = None):
+        self._rows    = rows
+        self._columns = columns
+
+    def collect(self) -> List[FakeRow]:
+        return [FakeRow(r) for r in self._rows]
+
+    def to_pandas(self, **kwargs):
+        import pandas as pd
+
+        return pd.DataFrame.from_records(self._rows, columns=self._columns)
+
+    def to_pandas_batches(self, statement_params=None, batch_size: int = 500):
+        import pandas as pd
+
+        for i in range(0, max(len(self._rows), 1), batch_size):
+            yield pd.DataFrame.from_records(self._rows[i:i + batch_size], columns=self._columns)
+
+
+class FakeData:
+    """The rows FakeSession serves; sizes are the knobs of the page benchmarks."""
+
+    def __init__(self, customers: int = 200, emails: int = 50, sales: int = 5_000, seed: int = 3):
+        rng = random.Random(seed)
+        self.customers = [
+            {
+                "ID": i,
+                "NAME": f"Customer {i}",
+                "EMAIL_ADDRESS": f"customer{i}@example.com",
+                "FULL_ADDRESS": f"{100 + i} Main St, Springfield, IL 62{i % 1000:03d}",
+                "LATITUDE": 39.78 + rng.uniform(-0.2, 0.2),
+                "LONGITUDE": -89.65 + rng.uniform(-0.2, 0.2),
+                "UPDATED_KEY": "2025-08-01 00:00:00.000000000",
+            }
+            for i in range(1, customers + 1)
+        ]
+        self.emails = [
+            {
+                "ID": i,
+                "MESSAGE_ID": f"msg-{i:05d}",
+                "SUBJECT": f"Bin request #{i}",
+                "RECEIVED_AT": f"2025-08-{1 + i % 28:02d} 09:00:00",
+                "STATUS": None,
+                "BODY": f"Please deliver 2 x 20-yard bins to {200 + i} Oak Ave, Springfield, IL 62704 by Friday.",
+                "COMMENT": "",
+                "IS_READ": False,
+                "PARSED_FIELDS": json.dumps({
+                    "container_format": "20-yard", "quantity": "2",
+                    "date_needed": "Friday", "requester": f"Requester {i}",
+                }),
+            }
+            for i in range(emails, 0, -1)
+        ]
+        stages = ["Prospecting", "Qualified", "Proposal", "Negotiation", "Closed Won", "Closed Lost"]
+        self.sales = [
+            {"DEAL_STAGE": rng.choice(stages), "DEALS": 1, "TOTAL_VALUE": round(rng.uniform(1e3, 1e5), 2)}
+            for _ in range(sales)
+        ]
+
+
+def _last_altered(query: str, params: Optional[List]) -> List[Dict]:
+    """INFORMATION_SCHEMA.TABLES rows for generated_sql.tables_version's (schema, name) conditions."""
+    it, rows = iter(params or []), []
+    for schema in re.findall(r"table_schema = (\?|CURRENT_SCHEMA\(\))", query):
+        schema = next(it) if schema == "?" else "PUBLIC"
+        rows.append({"TABLE_CATALOG": "DB", "TABLE_SCHEMA": schema, "TABLE_NAME": next(it),
+                     "LAST_ALTERED": "2025-08-01"})
+    return rows
+
+
+class FakeSession:
+    """
+    Snowpark session stand-in: session.sql(query, params) is answered by the
+    first handler whose pattern matches the query (case-insensitive); anything
+    else returns no rows. Queries are counted in `queries`.
+    """
+
+    def __init__(self, data: Optional[FakeData] = None, latency: float = 0.0):
+        self.data    = data or FakeData()
+        self.latency = latency
+        self.queries = 0
+        self.lookups = 0   # get_active_session() calls
+        self.handlers: List[Tuple[re.Pattern, Callable]] = [
+            (re.compile(p, re.IGNORECASE | re.DOTALL), h) for p, h in self._routes()
+        ]
+
+    def _routes(self):
+        d = self.data
+        by_mid = {e["MESSAGE_ID"]: e for e in d.emails}
+        return [
+            (r"^\s*(MERGE|INSERT|UPDATE|DELETE)\b", lambda q, p: [{"number of rows updated": len(p or [])}]),
+            (r"^\s*LIST @", lambda q, p: [{"name": "models/sales_metrics_model.yaml", "md5": "0" * 32,
+                                            "last_modified": "Fri, 1 Aug 2025 00:00:00 GMT"}]),
+            (r"^\s*SHOW CORTEX SEARCH SERVICES", lambda q, p: [{"created_on": "2025-08-01", "definition": "",
+                                                                 "data_timestamp": "2025-08-01"}]),
+            (r"row_count.*information_schema\.tables", lambda q, p: [{"ROW_COUNT": len(d.emails)}]),
+            (r"last_altered.*information_schema\.tables", _last_altered),
+            (r"CORTEX\.COMPLETE.*FROM emails_webinar_202508", lambda q, p: [
+                {"MESSAGE_ID": e["MESSAGE_ID"], "RAW_BODY": e["BODY"], "PARSED_FIELDS": e["PARSED_FIELDS"],
+                 "FULL_RESPONSE": None}
+                for e in [by_mid.get(p[0])] if e
+            ]),
+            (r"SELECT \* FROM emails_webinar_202508 WHERE message_id", lambda q, p: [
+                {k: v for k, v in by_mid[p[0]].items() if k != "PARSED_FIELDS"}
+            ] if p[0] in by_mid else []),
+            (r"received_key.*FROM emails_webinar_202508", lambda q, p: [
+                {"ID": e["ID"], "MESSAGE_ID": e["MESSAGE_ID"], "SUBJECT": e["SUBJECT"],
+                 "RECEIVED_AT": e["RECEIVED_AT"], "STATUS": e["STATUS"], "RECEIVED_KEY": e["RECEIVED_AT"]}
+                for e in d.emails[:p[-1]]
+            ]),
+            (r"FROM emails_webinar_202508.*is_read = FALSE", lambda q, p: [
+                {"MESSAGE_ID": e["MESSAGE_ID"], "RAW_BODY": e["BODY"], "PARSED_FIELDS": e["PARSED_FIELDS"]}
+                for e in d.emails[:5]
+            ]),
+            (r"TO_VARCHAR\(updated_at.*FROM CUSTOMERS_WEBINAR_202508", lambda q, p: [
+                {k: c[k] for k in ("EMAIL_ADDRESS", "NAME", "FULL_ADDRESS", "LATITUDE", "LONGITUDE", "UPDATED_KEY")}
+                for c in d.customers
+            ] if not p else []),
+            (r"^\s*SELECT email_address FROM CUSTOMERS_WEBINAR_202508", lambda q, p: [
+                {"EMAIL_ADDRESS": c["EMAIL_ADDRESS"]} for c in d.customers
+            ]),
+            (r"latitude IS NOT NULL.*FROM CUSTOMERS_WEBINAR_202508|FROM CUSTOMERS_WEBINAR_202508.*latitude IS NOT NULL",
+             lambda q, p: [{k: c[k] for k in ("EMAIL_ADDRESS", "NAME", "LATITUDE", "LONGITUDE")} for c in d.customers]),
+            (r"^\s*SELECT \* FROM CUSTOMERS_WEBINAR_202508", lambda q, p: [
+                {k: v for k, v in c.items() if k != "UPDATED_KEY"} for c in d.customers
+            ]),
+            (r"FROM sales_conversations", lambda q, p: [
+                {"CONVERSATION_ID": cid, "TRANSCRIPT_TEXT": f"Transcript of {cid}. " * 50} for cid in (p or [])
+            ]),
+            (r"FROM sales_metrics", lambda q, p: d.sales),
+        ]
+
+    def sql(self, query: str, params: Optional[List] = None) -> FakeDataFrame:
+        self.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+        for pattern, handler in self.handlers:
+            if pattern.search(query):
+                return FakeDataFrame(handler(query, params))
+        return FakeDataFrame([])
+
+
+# ── HERE / Precisely stub server ───────────────────────────────────────────
+
+def stub_position(address: str) -> Tuple[float, float]:
+    """The (lat, lon) the stub geocoders return for `address`."""
+    h = sum(map(ord, address)) % 1000
+    return 39.70 + h / 5000.0, -89.70 + h / 5000.0
+
+
+STUB_UNMATCHED = "nowhere"   # batch records containing this word get no match
+
+_job_ids = itertools.count(1)
+
+
+def _stub_route(origin: Tuple[float, float], destination: Tuple[float, float], n: int = 400) -> str:
+    from flexpolyline import encode
+
+    (lat0, lon0), (lat1, lon1) = origin, destination
+    points = [(lat0 + (lat1 - lat0) * i / (n - 1), lon0 + (lon1 - lon0) * i / (n - 1)) for i in range(n)]
+    return encode(points, precision=5)
+
+
+def _stub_demographics() -> Dict:
+    return {"themes": {
+        "populationTheme": {
+            "individualValueVariable": [
+                {"name": "POP", "description": "Population", "value": "12345"},
+                {"name": "HH", "description": "Households", "value": "4567"},
+            ],
+            "rangeVariable": [{
+                "name": "AGE", "description": "Age",
+                "field": [{"description": f"{a}-{a + 9}", "value": f"{10 + a % 7}%"} for a in range(0, 80, 10)],
+            }],
+        },
+        "incomeTheme": {
+            "individualValueVariable": [{"name": "MHI", "description": "Median household income", "value": "64000"}],
+        },
+    }}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real endpoints
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body: Dict, status: int = 200) -> None:
+        self._send(json.dumps(body).encode("utf-8"), "application/json", status)
+
+    def _reply_text(self, text: str, content_type: str = "text/plain") -> None:
+        self._send(text.encode("utf-8"), f"{content_type}; charset=utf-8")
+
+    def _send(self, raw: bytes, content_type: str, status: int = 200) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+        self.server.hits[self.path.split("?", 1)[0]] = self.server.hits.get(self.path.split("?", 1)[0], 0) + 1
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/v1/geocode":
+            lat, lng = stub_position(q.get("q", ""))
+            self._reply({"items": [{"title": q.get("q", ""), "position": {"lat": lat, "lng": lng}}]})
+        elif url.path.startswith("/6.2/jobs/"):
+            self._batch_job(url.path[len("/6.2/jobs/"):], q)
+        elif url.path == "/v8/routes":
+            o = tuple(map(float, q["origin"].split(",")))
+            d = tuple(map(float, q["destination"].split(",")))
+            self._reply({"routes": [{"sections": [{
+                "polyline": _stub_route(o, d),
+                "summary": {"length": 12_345, "duration": 1_234},
+            }]}]})
+        elif url.path == "/demographics":
+            self._reply(_stub_demographics())
+        else:
+            self._reply({"error": "not found"}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        raw = self._body()
+        if url.path == "/v8/matrix":
+            body = json.loads(raw or b"{}")
+            n = len(body.get("origins", [])) * len(body.get("destinations", []))
+            self._reply({"matrix": {
+                "numOrigins": len(body.get("origins", [])),
+                "numDestinations": len(body.get("destinations", [])),
+                "travelTimes": [600 + i % 900 for i in range(n)],
+                "distances": [5_000 + 7 * i % 20_000 for i in range(n)],
+            }})
+        elif url.path == "/6.2/jobs":
+            # HERE Batch Geocoder 6.2: pipe-delimited "recId|searchText" with a header row
+            job_id = f"job-{next(_job_ids)}"
+            lines  = raw.decode("utf-8").splitlines()[1:]
+            self.server.jobs[job_id] = {"records": [ln.split("|", 1) for ln in lines], "polls": 0}
+            self._reply_text(f"<Response><MetaInfo><RequestId>{job_id}</RequestId></MetaInfo>"
+                             f"<Status>accepted</Status></Response>", "application/xml")
+        elif url.path == "/oauth/token":
+            self._reply({"access_token": "fake-token", "expires_in": 3600})
+        else:
+            self._reply({"error": "not found"}, 404)
+
+
+    def _batch_job(self, rest: str, q: Dict[str, str]) -> None:
+        job_id, _, action = rest.partition("/")
+        job = self.server.jobs.get(job_id)
+        if job is None:
+            self._reply({"error": "unknown job"}, 404)
+        elif action == "result":
+            rows = ["recId|SeqNumber|seqLength|latitude|longitude"]
+            rows += [f"{rec}|1|1|{lat}|{lon}"
+                     for rec, text in job["records"] if STUB_UNMATCHED not in text.lower()
+                     for lat, lon in [stub_position(text)]]
+            self._reply_text("\n".join(rows))
+        elif q.get("action") == "status":
+            # running on the first poll, completed afterwards, so clients exercise their poll loop
+            job["polls"] += 1
+            status = "running" if job["polls"] == 1 else "completed"
+            self._reply_text(f"<Response><Status>{status}</Status></Response>", "application/xml")
+        else:
+            self._reply({"error": "not found"}, 404)
+
+
+class StubServer:
+    """HERE and Precisely stand-in on a free local port; use as a context manager."""
+
+    def __init__(self, latency: float = 0.0):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.latency = latency
+        self._httpd.hits = {}
+        self._httpd.jobs = {}   # batch geocode jobs by RequestId
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def hits(self) -> Dict[str, int]:
+        return self._httpd.hits
+
+    @property
+    def jobs(self) -> Dict[str, Dict]:
+        """Batch geocode jobs submitted so far: {RequestId: {"records", "polls"}}."""
+        return self._httpd.jobs
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+# ── wiring ─────────────────────────────────────────────────────────────────
+
+_installed: Optional[Tuple[FakeSession, FakeSnowflake]] = None
+
+
+def install(session: Optional[FakeSession] = None, snowflake: Optional[FakeSnowflake] = None):
+    """
+    Register FakeSnowflake as `_snowflake` and make
+    snowflake.snowpark.context.get_active_session() return `session`.
+    Call before importing any app module; app modules keep the session they
+    saw at import, so without arguments a second call returns the fakes
+    already installed. Returns (session, snowflake).
+    """
+    global _installed
+    if _installed is not None and session is None and snowflake is None:
+        return _installed
+    session   = session or FakeSession()
+    snowflake = snowflake or FakeSnowflake()
+    sys.modules["_snowflake"] = snowflake
+    try:
+        import snowflake.snowpark.context as context
+    except ImportError:
+        root    = sys.modules.setdefault("snowflake", types.ModuleType("snowflake"))
+        snowpark = types.ModuleType("snowflake.snowpark")
+        context = types.ModuleType("snowflake.snowpark.context")
+        root.snowpark, snowpark.context = snowpark, context
+        sys.modules["snowflake.snowpark"] = snowpark
+        sys.modules["snowflake.snowpark.context"] = context
+    def get_active_session():
+        session.lookups += 1
+        return session
+
+    context.get_active_session = get_active_session
+    _installed = (session, snowflake)
+    return _installed
+
+
+def point_apis_at(base_url: str) -> None:
+    """Send the HERE and Precisely clients to a StubServer and lift the rate limits."""
+    import call_here_api
+    import call_precisely_api
+    import rate_limit
+
+    call_here_api.HERE_GEOCODE_URL        = f"{base_url}/v1/geocode"
+    call_here_api.HERE_BATCH_URL          = f"{base_url}/6.2/jobs"
+    call_here_api.HERE_ROUTER_URL         = f"{base_url}/v8/routes"
+    call_here_api.HERE_MATRIX_URL         = f"{base_url}/v8/matrix"
+    call_precisely_api.PRECISELY_AUTH_URL = f"{base_url}/oauth/token"
+    call_precisely_api.PRECISELY_DEMO_URL = f"{base_url}/demographics"
+    for provider in rate_limit.PROVIDER_RATES:
+        rate_limit.PROVIDER_RATES[provider] = 1e6
+    rate_limit._buckets.clear()
@@ -0,0 +1,145 @@
+# benchmarks/harness.py
+"""
+Timing and result plumbing shared by the benchmarks.
+
+A result is a dict with at least "name" and "median_ms"; run_benchmarks.py
+collects them into one JSON document and checks them against
+thresholds.json ({name: max median_ms}).
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Dict, Iterable, List
+
+BENCH_DIR       = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR        = os.path.dirname(BENCH_DIR)
+THRESHOLDS_FILE = os.path.join(BENCH_DIR, "thresholds.json")
+RESULTS_FILE    = os.path.join(BENCH_DIR, "results", "latest.json")
+
+MIN_BATCH_SECONDS = 0.2   # each timed batch runs at least this long
+THRESHOLD_HEADROOM = 2.0  # --update-thresholds writes measured median x this
+
+
+def measure(name: str, func: Callable[[], object], repeat: int = 5, **meta) -> Dict:
+    """Time `func` like timeit (batches of at least MIN_BATCH_SECONDS) and return a result."""
+    number = 1
+    while timeit.timeit(func, number=number) < MIN_BATCH_SECONDS:
+        number *= 2
+    times = [t / number * 1e3 for t in timeit.repeat(func, number=number, repeat=repeat)]
+    return {
+        "name":      name,
+        "median_ms": statistics.median(times),
+        "best_ms":   min(times),
+        "number":    number,
+        "repeat":    repeat,
+        **meta,
+    }
+
+
+def measure_runs(
+    name: str,
+    func: Callable[[object], object],
+    repeat: int = 5,
+    setup: Callable[[], object] = lambda: None,
+    **meta,
+) -> Dict:
+    """
+    Time `repeat` single calls func(setup()) of a slow `func` (a page run);
+    setup() is not timed. The first call is reported separately as first_ms
+    since it fills the in-process caches.
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        t0 = time.perf_counter()
+        func(state)
+        times.append((time.perf_counter() - t0) * 1e3)
+    warm = times[1:] or times
+    return {
+        "name":      name,
+        "median_ms": statistics.median(warm),
+        "best_ms":   min(warm),
+        "first_ms":  times[0],
+        "number":    1,
+        "repeat":    repeat,
+        **meta,
+    }
+
+
+def skipped(name: str, reason: str) -> Dict:
+    """A benchmark that cannot run here (e.g. an optional dependency is missing)."""
+    return {"name": name, "skipped": reason}
+
+
+def failed(name: str, reason: str) -> Dict:
+    """A benchmark whose code under test raised; counts as a regression."""
+    return {"name": name, "error": reason}
+
+
+def environment() -> Dict:
+    return {
+        "python":   sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine":  platform.machine(),
+        "cpus":     os.cpu_count(),
+        "time":     time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def load_thresholds(path: str = THRESHOLDS_FILE) -> Dict[str, float]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def check(results: Iterable[Dict], thresholds: Dict[str, float]) -> List[Dict]:
+    """Annotate each result with its threshold and status: ok | regression | error | no-threshold | skipped."""
+    out = []
+    for r in results:
+        r = dict(r)
+        limit = thresholds.get(r["name"])
+        if "skipped" in r:
+            r["status"] = "skipped"
+        elif "error" in r:
+            r["status"] = "error"
+        elif limit is None:
+            r["status"] = "no-threshold"
+        else:
+            r["threshold_ms"] = limit
+            r["status"] = "regression" if r["median_ms"] > limit else "ok"
+        out.append(r)
+    return out
+
+
+def updated_thresholds(results: Iterable[Dict], thresholds: Dict[str, float],
+                       headroom: float = THRESHOLD_HEADROOM) -> Dict[str, float]:
+    new = dict(thresholds)
+    for r in results:
+        if "median_ms" in r:
+            new[r["name"]] = round(r["median_ms"] * headroom, 3)
+    return dict(sorted(new.items()))
+
+
+def write_json(path: str, doc: object) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2, sort_keys=False, default=str)
+        f.write("\n")
+
+
+def report(results: Iterable[Dict], out=None) -> None:
+    out = out or sys.stdout
+    for r in results:
+        if "skipped" in r or "error" in r:
+            tag = "SKIP" if "skipped" in r else "ERR "
+            out.write(f"{tag}  {r['name']}: {r.get('skipped') or r.get('error')}\n")
+            continue
+        limit = f" / {r['threshold_ms']:.3f}" if "threshold_ms" in r else ""
+        flag  = {"ok": "ok  ", "regression": "FAIL", "no-threshold": "new "}.get(r.get("status"), "    ")
+        first = f"  (first {r['first_ms']:.1f} ms)" if "first_ms" in r else ""
+        out.write(f"{flag}  {r['name']}: {r['median_ms']:.3f}{limit} ms{first}\n")
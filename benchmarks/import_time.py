@@ -0,0 +1,147 @@
+# benchmarks/import_time.py
+"""
+Cold-start report: how long a fresh interpreter takes to import the app
+(`streamlit_app` by default) against the fakes, how many secrets and
+Snowpark session lookups that costs, and which heavy libraries it pulls in.
+Every sample runs in a new process, so nothing is cached between samples.
+
+    python benchmarks/import_time.py [--module M] [--repeat N]
+                                     [--secret-latency S] [--compare GIT_REF] [--json FILE]
+
+--compare runs the same measurement on the tree of GIT_REF (extracted with
+`git archive`) and prints the difference. --secret-latency makes every
+secret read sleep S seconds, standing in for the round-trip a real secret
+read costs in Snowflake.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import BENCH_DIR, REPO_DIR, write_json
+
+HEAVY_MODULES = ("requests", "pydeck", "folium", "streamlit_folium", "altair", "pandas", "numpy")
+
+# runs in the child; argv: repo dir, bench dir, module, secret latency
+_CHILD = r"""
+import importlib, json, sys, time
+repo, bench, module, secret_latency = sys.argv[1], sys.argv[2], sys.argv[3], float(sys.argv[4])
+sys.path[:0] = [repo, bench]
+import fakes
+preloaded = set(sys.modules)
+session, snowflake = fakes.install(snowflake=fakes.FakeSnowflake(secret_latency=secret_latency))
+t0 = time.perf_counter()
+error = None
+try:
+    importlib.import_module(module)
+except Exception as e:
+    error = f"{type(e).__name__}: {e}"
+elapsed = time.perf_counter() - t0
+heavy = sorted(m for m in json.loads(sys.argv[5]) if m in sys.modules and m not in preloaded)
+print(json.dumps({
+    "import_ms": elapsed * 1e3,
+    "secret_reads": snowflake.secret_reads,
+    "session_lookups": session.lookups,
+    "heavy_modules": heavy,
+    "error": error,
+}))
+"""
+
+
+def _sample(tree: str, module: str, secret_latency: float, importtime: bool = False) -> Dict:
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", _CHILD, tree, BENCH_DIR, module, str(secret_latency), json.dumps(HEAVY_MODULES)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=tree)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "child failed")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if importtime:
+        result["top_imports"] = _top_imports(proc.stderr)
+    return result
+
+
+def _top_imports(stderr: str, n: int = 10) -> List[Dict]:
+    """Largest top-level imports by cumulative time from `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):  # nested imports are indented by two spaces per level
+            continue
+        rows.append({"module": name.strip(), "self_ms": int(self_us) / 1e3, "cumulative_ms": int(cumulative_us) / 1e3})
+    return sorted(rows, key=lambda r: -r["cumulative_ms"])[:n]
+
+
+def measure(tree: str, module: str, repeat: int, secret_latency: float) -> Dict:
+    samples = [_sample(tree, module, secret_latency) for _ in range(repeat)]
+    detail  = _sample(tree, module, secret_latency, importtime=True)
+    times   = [s["import_ms"] for s in samples]
+    return {
+        "module":          module,
+        "median_ms":       statistics.median(times),
+        "best_ms":         min(times),
+        "repeat":          repeat,
+        "secret_reads":    detail["secret_reads"],
+        "session_lookups": detail["session_lookups"],
+        "heavy_modules":   detail["heavy_modules"],
+        "error":           detail["error"],
+        "top_imports":     detail["top_imports"],
+    }
+
+
+def _extract(ref: str) -> str:
+    tmp = tempfile.mkdtemp(prefix="import_time_")
+    archive = subprocess.run(["git", "-C", REPO_DIR, "archive", ref], capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", tmp], input=archive.stdout, check=True)
+    return tmp
+
+
+def _print(label: str, r: Dict) -> None:
+    print(f"{label}: import {r['module']} median {r['median_ms']:.1f} ms (best {r['best_ms']:.1f} ms, n={r['repeat']})")
+    print(f"  secret reads {r['secret_reads']}, session lookups {r['session_lookups']}, "
+          f"heavy modules: {', '.join(r['heavy_modules']) or 'none'}")
+    if r["error"]:
+        print(f"  import failed: {r['error']}")
+    for imp in r["top_imports"][:5]:
+        print(f"  {imp['cumulative_ms']:8.1f} ms  {imp['module']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="streamlit_app")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--secret-latency", type=float, default=0.0)
+    parser.add_argument("--compare", metavar="GIT_REF", help="also measure this revision")
+    parser.add_argument("--json", metavar="FILE", help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report: Dict[str, Optional[Dict]] = {
+        "current": measure(REPO_DIR, args.module, args.repeat, args.secret_latency),
+    }
+    _print("current", report["current"])
+    if args.compare:
+        tree = _extract(args.compare)
+        try:
+            report["baseline"] = dict(measure(tree, args.module, args.repeat, args.secret_latency), ref=args.compare)
+        finally:
+            shutil.rmtree(tree, ignore_errors=True)
+        _print(f"baseline ({args.compare})", report["baseline"])
+        base, cur = report["baseline"]["median_ms"], report["current"]["median_ms"]
+        print(f"cold-start import: {base:.1f} -> {cur:.1f} ms ({base - cur:+.1f} ms saved, {cur / base:.0%} of baseline)")
+    if args.json:
+        write_json(os.path.abspath(args.json), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# benchmarks/run_benchmarks.py
+"""
+Run every benchmark offline, write the results as JSON and compare them with
+thresholds.json (maximum median ms per benchmark).
+
+    python benchmarks/run_benchmarks.py [--quick] [--only PREFIX] [--out FILE]
+                                        [--update-thresholds]
+
+Exits with status 1 when a benchmark is over its threshold or its code
+raised. Benchmarks without a threshold are reported as "new"; skipped ones
+(a missing optional dependency) do not fail the run.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes
+
+fakes.install()  # before any app module is imported
+
+import bench_flexpolyline
+import bench_here
+import bench_pages
+import bench_parsing
+from harness import (
+    RESULTS_FILE,
+    THRESHOLDS_FILE,
+    check,
+    environment,
+    load_thresholds,
+    report,
+    updated_thresholds,
+    write_json,
+)
+
+SUITES = {
+    "flexpolyline": bench_flexpolyline.bench,
+    "parsing":      bench_parsing.bench,
+    "here":         bench_here.bench,
+    "pages":        bench_pages.bench,
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--quick", action="store_true", help="smaller inputs and fewer repeats")
+    parser.add_argument("--only", default="", help="run only suites whose name starts with this")
+    parser.add_argument("--out", default=RESULTS_FILE, help="results JSON file")
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE)
+    parser.add_argument("--update-thresholds", action="store_true",
+                        help="rewrite the thresholds from this run's medians")
+    args = parser.parse_args(argv)
+
+    results = []
+    for suite, bench in SUITES.items():
+        if suite.startswith(args.only):
+            results += [dict(r, suite=suite) for r in bench(quick=args.quick)]
+
+    thresholds = load_thresholds(args.thresholds)
+    checked = check(results, thresholds)
+    write_json(args.out, {"environment": environment(), "quick": args.quick, "results": checked})
+    report(checked)
+
+    if args.update_thresholds:
+        write_json(args.thresholds, updated_thresholds(results, thresholds))
+        return 0
+    return 1 if any(r["status"] in ("regression", "error") for r in checked) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,144 +1,282 @@
 # bin_request_retrieval.py
 
+import hashlib
 import json
-from snowflake.snowpark.context import get_active_session
+from typing import Iterable, List, Optional, Tuple
+from clients import get_session
+import tracing
+from ttl_cache import TTLCache
 
-session = get_active_session()
+EMAILS_TABLE = "emails_webinar_202508"
 
-def fetch_bin_request(message_id: str) -> dict:
-    """
-    Fetch and parse bin request details for exactly one email by message_id.
-    Returns a dict with the same keys as fetch_bin_requests(), or empty if not found.
-    """
-    REQUEST_SQL = f"""
-    SELECT
-      message_id,
-      body AS raw_body,
-      SNOWFLAKE.CORTEX.COMPLETE(
+# Cortex call that extracts the request fields from an email `body`; shared with
+# bin_request_worker.py, which precomputes it into emails_webinar_202508.parsed_fields
+EXTRACTION_COMPLETE_SQL = """SNOWFLAKE.CORTEX.COMPLETE(
         'claude-4-sonnet',
         [
-          {{'role':'system',
-            'content': $$Extract a JSON object with exactly these keys:
-              "container_format","quantity","date_needed","requester".
-              Output only the JSON object (no markdown).$$}},
-          {{'role':'user', 'content': body}}
+          {'role':'system',
+           'content': $$Extract a JSON object with exactly these keys:
+             "container_format","quantity","date_needed","requester".
+             Output only the JSON object (no markdown).$$},
+          {'role':'user', 'content': body}
         ],
-        {{}}
-      ) AS full_response
-    FROM emails_webinar_202508
-    WHERE message_id = '{message_id}'
-    """
-    df = session.sql(REQUEST_SQL)
-    pdf = df.to_pandas()
-    if pdf.empty:
-        return {}
+        {}
+      )"""
+
+REQUEST_FIELDS = ("container_format", "quantity", "date_needed", "requester")
+
+# values of emails_webinar_202508.status; NULL means not triaged yet
+REQUEST_STATUSES = ("approved", "rejected")
 
-    row     = pdf.iloc[0]
-    raw     = row["RAW_BODY"] or ""
-    outer_j = row["FULL_RESPONSE"] or ""
+# inbox listing: only what a list row shows, newest first
+EMAIL_LIST_COLUMNS = ("id", "message_id", "subject", "received_at", "status")
+EMAIL_PAGE_SIZE    = 5
 
+# (received_at as 'YYYY-MM-DD HH24:MI:SS.FF9' or None, id) of the last row of a page
+EmailCursor = Tuple[Optional[str], int]
+
+# message_id -> (body hash, parsed request); survives Streamlit reruns
+BIN_REQUEST_CACHE_SIZE = 256
+_request_cache = TTLCache(maxsize=BIN_REQUEST_CACHE_SIZE)
+
+
+def _body_hash(body: str) -> str:
+    return hashlib.sha256((body or "").encode("utf-8")).hexdigest()
+
+
+def parse_completion_envelope(outer_j: str) -> str:
+    """Unwrap a COMPLETE response and return the inner message under choices[0].messages."""
+    # 1) parse the outer envelope
     try:
-        outer = json.loads(outer_j)
+        outer = json.loads(outer_j or "{}")
     except json.JSONDecodeError:
         outer = {}
 
+    # 2) drill into choices[0].messages
     choices = outer.get("choices", [])
-    msg_str = choices[0].get("messages", "") if choices else ""
+    if choices and isinstance(choices, list):
+        return choices[0].get("messages", "")
+    return ""
 
+
+def build_bin_request(message_id: str, raw: str, msg_str: str) -> dict:
+    """Assemble the request dict from the inner JSON string (parsed_fields or COMPLETE output)."""
     try:
         inner = json.loads(msg_str)
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, TypeError):
+        inner = {}
+    if not isinstance(inner, dict):
         inner = {}
 
-    return {
-        "message_id":       message_id,
-        "raw_body":         raw,
-        "json_output":      msg_str,
-        "container_format": inner.get("container_format", ""),
-        "quantity":         inner.get("quantity", ""),
-        "date_needed":      inner.get("date_needed", ""),
-        "requester":        inner.get("requester", ""),
+    # pull out your four keys (default to empty string)
+    entry = {
+        "message_id":  message_id,
+        "raw_body":    raw,
+        "json_output": msg_str,    # the *inner* JSON
     }
+    for key in REQUEST_FIELDS:
+        entry[key] = inner.get(key, "")
+    return entry
+
+
+def fetch_bin_request(message_id: str, body: Optional[str] = None) -> dict:
+    """
+    Fetch and parse bin request details for exactly one email by message_id.
+    Memoized on message_id + a hash of the body: when the caller already has
+    the body, a repeat call is answered from memory without touching Snowflake.
+    Otherwise uses the precomputed parsed_fields when the worker has filled
+    them, and runs COMPLETE for this message only as a last resort.
+    Returns a dict with the same keys as fetch_bin_requests(), or empty if not found.
+    """
+    if body is not None:
+        hit = _request_cache.get(message_id)
+        if hit is not None and hit[0] == _body_hash(body):
+            with tracing.span("sql.fetch_bin_request", kind="sql") as sp:
+                sp.set(cache_hit=True)
+            return hit[1]
+
+    REQUEST_SQL = f"""
+    SELECT
+      message_id,
+      body AS raw_body,
+      parsed_fields,
+      CASE WHEN parsed_fields IS NULL THEN
+      {EXTRACTION_COMPLETE_SQL}
+      END AS full_response
+    FROM {EMAILS_TABLE}
+    WHERE message_id = ?
+    """
+    with tracing.span("sql.fetch_bin_request", kind="sql") as sp:
+        df = get_session().sql(REQUEST_SQL, params=[message_id])
+        pdf = df.to_pandas()
+        sp.set(rows=len(pdf), cache_hit=False)
+        if not pdf.empty and pdf.iloc[0]["PARSED_FIELDS"] is None:
+            # the row needed SNOWFLAKE.CORTEX.COMPLETE; that dominates the query
+            sp.set(kind="complete", bytes=len(pdf.iloc[0]["FULL_RESPONSE"] or ""))
+    if pdf.empty:
+        return {}
+
+    row = pdf.iloc[0]
+    raw = row["RAW_BODY"] or ""
+    if row["PARSED_FIELDS"] is not None:
+        entry = build_bin_request(message_id, raw, row["PARSED_FIELDS"])
+    else:
+        entry = build_bin_request(message_id, raw, parse_completion_envelope(row["FULL_RESPONSE"]))
+    _request_cache.set(message_id, (_body_hash(raw), entry))
+    return entry
+
+
+def invalidate_bin_request(message_id: str) -> None:
+    """Forget the memoized extraction for message_id."""
+    _request_cache.pop(message_id)
+
+
+def reextract_bin_request(message_id: str) -> dict:
+    """Run COMPLETE again for one email, overwrite its parsed_fields and return the result."""
+    from bin_request_worker import process_batch
+
+    invalidate_bin_request(message_id)
+    process_batch(get_session(), [message_id])
+    return fetch_bin_request(message_id)
+
+
+def fetch_email_page(
+    after: Optional[EmailCursor] = None,
+    page_size: int = EMAIL_PAGE_SIZE,
+) -> Tuple[List[dict], Optional[EmailCursor]]:
+    """
+    One page of the inbox ordered by received_at DESC, id DESC, starting after
+    the `after` cursor (keyset pagination, so the cost does not depend on how
+    deep the page is). Only EMAIL_LIST_COLUMNS are read; no body.
+    Returns (rows, cursor of the next page or None on the last page).
+    """
+    if after is None:
+        where, params = "", []
+    elif after[0] is None:
+        # already inside the trailing NULL received_at rows
+        where, params = "WHERE received_at IS NULL AND id < ?", [after[1]]
+    else:
+        where = """WHERE received_at < TO_TIMESTAMP_NTZ(?)
+         OR (received_at = TO_TIMESTAMP_NTZ(?) AND id < ?)
+         OR received_at IS NULL"""
+        params = [after[0], after[0], after[1]]
+
+    with tracing.span("sql.fetch_email_page", kind="sql") as sp:
+        rows = get_session().sql(
+            f"""
+            SELECT {", ".join(EMAIL_LIST_COLUMNS)},
+                   TO_VARCHAR(received_at, 'YYYY-MM-DD HH24:MI:SS.FF9') AS received_key
+            FROM {EMAILS_TABLE}
+            {where}
+            ORDER BY received_at DESC NULLS LAST, id DESC
+            LIMIT ?
+            """,
+            params=params + [page_size + 1],
+        ).collect()
+        sp.set(rows=len(rows))
+
+    page = [
+        {k.lower(): v for k, v in r.as_dict().items()}
+        for r in rows[:page_size]
+    ]
+    next_cursor = None
+    if len(rows) > page_size:
+        last = page[-1]
+        next_cursor = (last["received_key"], last["id"])
+    return page, next_cursor
+
+
+def fetch_email(message_id: str) -> dict:
+    """The full row of one email (lower-cased column names), or empty if not found."""
+    with tracing.span("sql.fetch_email", kind="sql") as sp:
+        rows = get_session().sql(
+            f"SELECT * FROM {EMAILS_TABLE} WHERE message_id = ? LIMIT 1",
+            params=[message_id],
+        ).collect()
+        sp.set(rows=len(rows))
+    if not rows:
+        return {}
+    return {k.lower(): v for k, v in rows[0].as_dict().items()}
 
 
+def approx_email_count() -> Optional[int]:
+    """Row count from table metadata (no scan); None if it is not available."""
+    with tracing.span("sql.approx_email_count", kind="sql") as sp:
+        rows = get_session().sql(
+            """
+            SELECT row_count
+            FROM information_schema.tables
+            WHERE table_schema = CURRENT_SCHEMA()
+              AND table_name = ?
+            """,
+            params=[EMAILS_TABLE.upper()],
+        ).collect()
+        sp.set(rows=len(rows))
+    if not rows or rows[0]["ROW_COUNT"] is None:
+        return None
+    return int(rows[0]["ROW_COUNT"])
+
 
 def fetch_bin_requests() -> list[dict]:
     """
-    Fetch unread emails, call Cortex.COMPLETE, unwrap the envelope
-    under choices[0].messages, and return:
+    Return up to 5 unread emails whose fields have been precomputed by
+    bin_request_worker.py (no LLM call here), as dicts with:
       - message_id
       - raw_body
       - json_output (the *inner* JSON string)
       - container_format, quantity, date_needed, requester
     """
-    REQUEST_SQL = """
+    REQUEST_SQL = f"""
     SELECT
       message_id,
       body AS raw_body,
-      SNOWFLAKE.CORTEX.COMPLETE(
-        'claude-4-sonnet',
-        [
-          {'role':'system',
-           'content': $$Extract a JSON object with exactly these keys:
-             "container_format","quantity","date_needed","requester".
-             Output only the JSON object (no markdown).$$},
-          {'role':'user', 'content': body}
-        ],
-        {}
-      ) AS full_response
-    FROM emails_webinar_202508
+      parsed_fields
+    FROM {EMAILS_TABLE}
     WHERE is_read = FALSE
+      AND parsed_fields IS NOT NULL
     LIMIT 5
     """
-    df  = session.sql(REQUEST_SQL)
-    pdf = df.to_pandas()
-
-    results = []
-    for row in pdf.itertuples(index=False):
-        raw     = row.RAW_BODY or ""
-        outer_j = row.FULL_RESPONSE or "{}"
-
-        # 1) parse the outer envelope
-        try:
-            outer = json.loads(outer_j)
-        except json.JSONDecodeError:
-            outer = {}
-
-        # 2) drill into choices[0].messages
-        choices = outer.get("choices", [])
-        if choices and isinstance(choices, list):
-            msg_str = choices[0].get("messages", "")
-        else:
-            msg_str = ""
-
-        # 3) parse that inner JSON
-        try:
-            inner = json.loads(msg_str)
-        except json.JSONDecodeError:
-            inner = {}
-
-        # 4) pull out your four keys (default to empty string)
-        fmt = inner.get("container_format", "")
-        qty = inner.get("quantity", "")
-        dt  = inner.get("date_needed", "")
-        req = inner.get("requester", "")
-
-        results.append({
-            "message_id":       row.MESSAGE_ID,
-            "raw_body":         raw,
-            "json_output":      msg_str,    # the *inner* JSON
-            "container_format": fmt,
-            "quantity":         qty,
-            "date_needed":      dt,
-            "requester":        req,
-        })
-
-    return results
+    with tracing.span("sql.fetch_bin_requests", kind="sql") as sp:
+        df  = get_session().sql(REQUEST_SQL)
+        pdf = df.to_pandas()
+        sp.set(rows=len(pdf))
+
+    return [
+        build_bin_request(row.MESSAGE_ID, row.RAW_BODY or "", row.PARSED_FIELDS)
+        for row in pdf.itertuples(index=False)
+    ]
+
+
+def mark_requests(message_ids: Iterable[str], status: Optional[str] = None) -> int:
+    """
+    Mark many emails as read in one bound MERGE, setting their triage `status`
+    (one of REQUEST_STATUSES) when given. Returns the number of rows updated.
+    """
+    if status is not None and status not in REQUEST_STATUSES:
+        raise ValueError(f"Unknown request status {status!r}; expected one of {REQUEST_STATUSES}")
+    ids = list(dict.fromkeys(message_ids))
+    if not ids:
+        return 0
+
+    assignments, params = "is_read = TRUE", list(ids)
+    if status is not None:
+        assignments += ", status = ?, status_updated_at = CURRENT_TIMESTAMP()"
+        params.append(status)
+
+    with tracing.span("sql.mark_requests", kind="sql") as sp:
+        result = get_session().sql(
+            f"""
+            MERGE INTO {EMAILS_TABLE} e
+            USING (SELECT column1 AS message_id FROM VALUES {", ".join(["(?)"] * len(ids))}) s
+            ON e.message_id = s.message_id
+            WHEN MATCHED THEN UPDATE SET {assignments}
+            """,
+            params=params,
+        ).collect()
+        updated = int(result[0][0]) if result else 0
+        sp.set(rows=updated)
+    return updated
 
 
 def mark_request_read(message_id: str) -> None:
-    session.sql(f"""
-      UPDATE emails_webinar_202508
-      SET is_read = TRUE
-      WHERE message_id = '{message_id}'
-    """).collect()
\ No newline at end of file
+    mark_requests([message_id])
@@ -0,0 +1,138 @@
+# bin_request_worker.py
+"""
+Background worker that precomputes bin request fields for new emails.
+
+New rows of emails_webinar_202508 are picked up through the change-tracking
+stream on that table and copied into a durable queue table. Queued messages are
+then extracted with SNOWFLAKE.CORTEX.COMPLETE in batches, with a bounded number
+of batches in flight, and each batch writes parsed_fields with a single UPDATE.
+A message leaves the queue only after its fields are written, so the worker can
+be stopped and restarted at any point.
+
+    python bin_request_worker.py --batch-size 20 --concurrency 4
+    python bin_request_worker.py --loop --interval 60
+
+It can also run as a stored procedure / task handler through run(session).
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from bin_request_retrieval import EMAILS_TABLE, EXTRACTION_COMPLETE_SQL
+
+PARSE_STREAM = "emails_webinar_202508_parse_stream"
+PARSE_QUEUE  = "email_parse_queue_webinar_202508"
+
+DEFAULT_BATCH_SIZE  = 20
+DEFAULT_CONCURRENCY = 4
+
+
+def enqueue_new_emails(session) -> int:
+    """
+    Move new message ids from the change-tracking stream into the queue.
+    Reading the stream inside this MERGE advances its offset atomically.
+    """
+    result = session.sql(f"""
+      MERGE INTO {PARSE_QUEUE} q
+      USING (
+        SELECT DISTINCT message_id
+        FROM {PARSE_STREAM}
+        WHERE METADATA$ACTION = 'INSERT' AND message_id IS NOT NULL
+      ) s
+      ON q.message_id = s.message_id
+      WHEN NOT MATCHED THEN INSERT (message_id) VALUES (s.message_id)
+    """).collect()
+    return int(result[0][0]) if result else 0
+
+
+def claim_batches(session, batch_size: int) -> List[List[str]]:
+    """Queued message ids still lacking parsed_fields, split into batches."""
+    rows = session.sql(f"""
+      SELECT q.message_id
+      FROM {PARSE_QUEUE} q
+      JOIN {EMAILS_TABLE} e ON e.message_id = q.message_id
+      WHERE e.parsed_fields IS NULL
+      ORDER BY q.enqueued_at
+    """).collect()
+    ids = [r["MESSAGE_ID"] for r in rows]
+    return [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+
+
+def process_batch(session, message_ids: List[str]) -> int:
+    """
+    Extract one batch server-side and write parsed_fields in a single UPDATE.
+    A reply that is not valid JSON is kept as {"_unparsed": ...} so it is not
+    retried forever; then the batch is removed from the queue.
+    """
+    if not message_ids:
+        return 0
+    binds = ", ".join(["?"] * len(message_ids))
+    session.sql(f"""
+      UPDATE {EMAILS_TABLE} e
+      SET parsed_fields = s.parsed
+      FROM (
+        SELECT message_id,
+               COALESCE(
+                 TRY_PARSE_JSON(msg),
+                 OBJECT_CONSTRUCT('_unparsed', msg)
+               ) AS parsed
+        FROM (
+          SELECT message_id,
+                 TRY_PARSE_JSON({EXTRACTION_COMPLETE_SQL}):choices[0]:messages::STRING AS msg
+          FROM {EMAILS_TABLE}
+          WHERE message_id IN ({binds})
+        )
+      ) s
+      WHERE e.message_id = s.message_id
+    """, params=message_ids).collect()
+    session.sql(
+        f"DELETE FROM {PARSE_QUEUE} WHERE message_id IN ({binds})",
+        params=message_ids,
+    ).collect()
+    return len(message_ids)
+
+
+def run(
+    session,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> int:
+    """Drain the stream and the queue once; returns the number of emails parsed."""
+    enqueue_new_emails(session)
+    batches = claim_batches(session, batch_size)
+    if not batches:
+        return 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return sum(pool.map(lambda ids: process_batch(session, ids), batches))
+
+
+def _get_session():
+    from snowflake.snowpark import Session
+    from snowflake.snowpark.context import get_active_session
+
+    try:
+        return get_active_session()
+    except Exception:
+        return Session.builder.getOrCreate()  # default connection from connections.toml
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--loop", action="store_true", help="keep polling for new emails")
+    parser.add_argument("--interval", type=float, default=60, help="seconds between polls with --loop")
+    args = parser.parse_args(argv)
+
+    session = _get_session()
+    while True:
+        n = run(session, args.batch_size, args.concurrency)
+        print(f"parsed_fields written for {n} emails")
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
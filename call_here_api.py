@@ -1,55 +1,297 @@
 # call_here_api.py
-import os
-import _snowflake
-import requests
-from typing import Tuple, Dict, List, Union
-from flexpolyline import decode
+import time
+import xml.etree.ElementTree as ET
+import http_client
+import tracing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Tuple, Dict, List, Union, Iterable, Iterator, Optional
+from flexpolyline import decode, decode_array
+from clients import get_secret
+from rate_limit import get_bucket
 
 
-secret = _snowflake.get_generic_secret_string("here_api_key")
-os.environ["HERE_API_KEY"] = secret
+def _api_key() -> str:
+    """HERE key, read from the bound secret on the first API call."""
+    return get_secret("here_api_key")
+
+
+GEOCODE_MAX_WORKERS = 8  # concurrent geocode requests in geocode_many()
+
+# HERE Batch Geocoder; point at a local stand-in server to run offline
+HERE_BATCH_URL        = "https://batch.geocoder.ls.hereapi.com/6.2/jobs"
+BATCH_POLL_INTERVAL   = 5      # seconds between status checks
+BATCH_TIMEOUT         = 1800   # seconds before run_batch_geocode() gives up
+BATCH_DONE_STATES     = {"completed"}
+BATCH_FAILED_STATES   = {"failed", "cancelled", "deleted"}
+
+# HERE Geocoding / Routing v8 / Matrix Routing v8; point at a local stand-in server to run offline
+HERE_GEOCODE_URL        = "https://geocode.search.hereapi.com/v1/geocode"
+HERE_ROUTER_URL         = "https://router.hereapi.com/v8/routes"
+HERE_MATRIX_URL         = "https://matrix.router.hereapi.com/v8/matrix"
+MATRIX_MAX_ORIGINS      = 15    # synchronous matrix request limit (world region)
+MATRIX_MAX_DESTINATIONS = 100
+MATRIX_MAX_WORKERS      = 4
+MATRIX_TIMEOUT          = (5, 60)
 
 def call_geocoding_here_api(address: str) -> Dict:
     params = {
         "q":      address,
-        "apiKey": secret,
+        "apiKey": _api_key(),
     }
-    resp = requests.get(
-        "https://geocode.search.hereapi.com/v1/geocode",
-        params=params,
-        timeout=30
-    )
+    with tracing.span("here.geocode", kind="here") as sp:
+        resp = http_client.get(HERE_GEOCODE_URL, params=params)
+        sp.response(resp)
     resp.raise_for_status()
     return resp.json()
 
 
+def _rate_limited_geocode(address: str) -> Dict:
+    get_bucket("here").acquire()
+    return call_geocoding_here_api(address)
+
+
+def iter_geocode_many(
+    addresses: Iterable[str],
+    max_workers: int = GEOCODE_MAX_WORKERS,
+) -> Iterator[Tuple[str, Optional[Dict], Optional[Exception]]]:
+    """
+    Geocode `addresses` on a bounded thread pool, throttled by the shared
+    HERE token bucket, and yield (address, json, error) as each completes.
+    A failed address yields its exception instead of aborting the batch.
+    """
+    addresses = list(dict.fromkeys(addresses))
+    if not addresses:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(addresses)))) as pool:
+        # one bound context per task: a Context cannot be entered by two threads at once
+        futures = {pool.submit(tracing.bind(_rate_limited_geocode), a): a for a in addresses}
+        for fut in as_completed(futures):
+            try:
+                yield futures[fut], fut.result(), None
+            except Exception as e:
+                yield futures[fut], None, e
+
+
+def geocode_many(
+    addresses: Iterable[str],
+    max_workers: int = GEOCODE_MAX_WORKERS,
+) -> Dict[str, Optional[Dict]]:
+    """
+    Parallel call_geocoding_here_api(): {address: HERE json}.
+    Addresses whose request failed map to None.
+    """
+    return {addr: geo for addr, geo, _ in iter_geocode_many(addresses, max_workers)}
+
+
+def _xml_field(xml_text: str, name: str) -> str:
+    """First element called `name` in a HERE batch XML reply, ignoring namespaces."""
+    for el in ET.fromstring(xml_text).iter():
+        if el.tag.rsplit("}", 1)[-1] == name:
+            return (el.text or "").strip()
+    return ""
+
+
+def submit_batch_geocode_job(addresses: List[str]) -> str:
+    """
+    Submit `addresses` as one asynchronous HERE batch job and return its
+    RequestId. Record ids are the 0-based positions in `addresses`.
+    """
+    lines = ["recId|searchText"]
+    lines += [f"{i}|{a.replace('|', ' ')}" for i, a in enumerate(addresses)]
+    params = {
+        "apiKey":         _api_key(),
+        "action":         "run",
+        "header":         "true",
+        "inDelim":        "|",
+        "outDelim":       "|",
+        "outCols":        "latitude,longitude",
+        "outputcombined": "true",
+    }
+    with tracing.span("here.batch_submit", kind="here") as sp:
+        resp = http_client.post(
+            HERE_BATCH_URL,
+            params=params,
+            data="\n".join(lines).encode("utf-8"),
+            headers={"Content-Type": "text/plain; charset=utf-8"},
+            timeout=60
+        )
+        sp.response(resp)
+    resp.raise_for_status()
+    job_id = _xml_field(resp.text, "RequestId")
+    if not job_id:
+        raise RuntimeError(f"HERE batch job was not accepted: {resp.text[:200]}")
+    return job_id
+
+
+def get_batch_geocode_status(job_id: str) -> str:
+    with tracing.span("here.batch_status", kind="here") as sp:
+        resp = http_client.get(
+            f"{HERE_BATCH_URL}/{job_id}",
+            params={"action": "status", "apiKey": _api_key()},
+            timeout=30
+        )
+        sp.response(resp)
+    resp.raise_for_status()
+    return _xml_field(resp.text, "Status").lower()
+
+
+def fetch_batch_geocode_result(job_id: str) -> Dict[int, Tuple[float, float]]:
+    """Download a completed job (uncompressed) as {recId: (lat, lon)}, first match per record."""
+    with tracing.span("here.batch_result", kind="here") as sp:
+        resp = http_client.get(
+            f"{HERE_BATCH_URL}/{job_id}/result",
+            params={"apiKey": _api_key(), "outputcompressed": "false"},
+            timeout=120
+        )
+        sp.response(resp)
+    resp.raise_for_status()
+    rows = resp.text.splitlines()
+    if not rows:
+        return {}
+    header = [h.strip().lower() for h in rows[0].split("|")]
+    i_rec, i_lat, i_lon = header.index("recid"), header.index("latitude"), header.index("longitude")
+
+    out: Dict[int, Tuple[float, float]] = {}
+    for line in rows[1:]:
+        cols = line.split("|")
+        try:
+            rec = int(cols[i_rec])
+            if rec not in out:
+                out[rec] = (float(cols[i_lat]), float(cols[i_lon]))
+        except (IndexError, ValueError):
+            continue  # unmatched record or malformed row
+    return out
+
+
+def run_batch_geocode(
+    addresses: Iterable[str],
+    poll_interval: float = BATCH_POLL_INTERVAL,
+    timeout: float = BATCH_TIMEOUT,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Geocode many addresses with one HERE batch job: submit, poll until the job
+    completes, download. Returns {address: (lat, lon)} for matched addresses.
+    """
+    addresses = list(dict.fromkeys(addresses))
+    if not addresses:
+        return {}
+    job_id   = submit_batch_geocode_job(addresses)
+    deadline = time.monotonic() + timeout
+    while True:
+        status = get_batch_geocode_status(job_id)
+        if status in BATCH_DONE_STATES:
+            break
+        if status in BATCH_FAILED_STATES:
+            raise RuntimeError(f"HERE batch job {job_id} ended as {status!r}")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"HERE batch job {job_id} still {status!r} after {timeout}s")
+        time.sleep(poll_interval)
+    return {
+        addresses[rec]: latlon
+        for rec, latlon in fetch_batch_geocode_result(job_id).items()
+        if 0 <= rec < len(addresses)
+    }
+
+
 def call_routing_here_api(
     origin: Tuple[float, float],
     destination: Tuple[float, float],
+    transport_mode: str = "car",
+    return_: str = "polyline",
 ) -> Dict:
     """
     Call HERE Routing v8 and return the JSON.
+    `return_` is the v8 `return` parameter, e.g. "polyline,summary".
     """
     params = {
-        "transportMode": "car",
+        "transportMode": transport_mode,
         "origin":        f"{origin[0]},{origin[1]}",
         "destination":   f"{destination[0]},{destination[1]}",
-        "return":        "polyline",
-        "apikey":        secret,
+        "return":        return_,
+        "apikey":        _api_key(),
     }
-    # debug print to Streamlit
-    import streamlit as st
-    st.write(f"🔍 Debug — routing v8 params: {params}")
-
-    resp = requests.get(
-        "https://router.hereapi.com/v8/routes",
-        params=params,
-        timeout=30
-    )
+    with tracing.span("here.route", kind="here") as sp:
+        resp = http_client.get(HERE_ROUTER_URL, params=params)
+        sp.response(resp)
     resp.raise_for_status()
     return resp.json()
 
 
+def call_matrix_routing_here_api(
+    origins: List[Tuple[float, float]],
+    destinations: List[Tuple[float, float]],
+    transport_mode: str = "car",
+) -> Dict:
+    """
+    One synchronous HERE Matrix Routing v8 request (at most MATRIX_MAX_ORIGINS x
+    MATRIX_MAX_DESTINATIONS). Returns the `matrix` object: travelTimes (s) and
+    distances (m) as flat row-major lists, plus errorCodes when some cells failed.
+    """
+    body = {
+        "origins":          [{"lat": lat, "lng": lon} for lat, lon in origins],
+        "destinations":     [{"lat": lat, "lng": lon} for lat, lon in destinations],
+        "regionDefinition": {"type": "world"},
+        "matrixAttributes": ["travelTimes", "distances"],
+        "transportMode":    transport_mode,
+    }
+    with tracing.span("here.matrix", kind="here") as sp:
+        resp = http_client.post(
+            HERE_MATRIX_URL,
+            params={"async": "false", "apiKey": _api_key()},
+            json=body,
+            timeout=MATRIX_TIMEOUT,
+        )
+        sp.response(resp)
+    resp.raise_for_status()
+    return resp.json().get("matrix", {})
+
+
+def matrix_routes(
+    origins: List[Tuple[float, float]],
+    destinations: List[Tuple[float, float]],
+    transport_mode: str = "car",
+    max_workers: int = MATRIX_MAX_WORKERS,
+):
+    """
+    Many-to-many travel times and distances, split into blocks the synchronous
+    matrix endpoint accepts and requested concurrently (rate-limited).
+    Returns (travel_times_s, distances_m) as float arrays of shape
+    (len(origins), len(destinations)); NaN where HERE found no route.
+    """
+    import numpy as np
+
+    times = np.full((len(origins), len(destinations)), np.nan)
+    dists = np.full((len(origins), len(destinations)), np.nan)
+    blocks = [
+        (o, d)
+        for o in range(0, len(origins), MATRIX_MAX_ORIGINS)
+        for d in range(0, len(destinations), MATRIX_MAX_DESTINATIONS)
+    ]
+
+    def fetch(block):
+        o, d = block
+        get_bucket("here").acquire()
+        return block, call_matrix_routing_here_api(
+            origins[o:o + MATRIX_MAX_ORIGINS],
+            destinations[d:d + MATRIX_MAX_DESTINATIONS],
+            transport_mode,
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(tracing.bind(fetch), block) for block in blocks]
+        for (o, d), matrix in (f.result() for f in futures):
+            n_o = min(MATRIX_MAX_ORIGINS, len(origins) - o)
+            n_d = min(MATRIX_MAX_DESTINATIONS, len(destinations) - d)
+            block_t = np.asarray(matrix.get("travelTimes") or [np.nan] * n_o * n_d, dtype=float)
+            block_d = np.asarray(matrix.get("distances") or [np.nan] * n_o * n_d, dtype=float)
+            errors  = np.asarray(matrix.get("errorCodes") or [0] * n_o * n_d)
+            block_t[errors != 0] = np.nan
+            block_d[errors != 0] = np.nan
+            times[o:o + n_o, d:d + n_d] = block_t.reshape(n_o, n_d)
+            dists[o:o + n_o, d:d + n_d] = block_d.reshape(n_o, n_d)
+    return times, dists
+
+
 def decode_polyline(data: Union[str, Dict]) -> List[Tuple[float, float]]:
     """
     Decode either:
@@ -69,23 +311,50 @@ def decode_polyline(data: Union[str, Dict]) -> List[Tuple[float, float]]:
     return decode(data)
 
 
+def decode_polyline_array(data: Union[str, Dict]):
+    """
+    Same as decode_polyline(), but returns a float64 numpy array of shape
+    (N, 2) or (N, 3) built by the vectorized flexpolyline decoder.
+    """
+    import numpy as np
+
+    if isinstance(data, dict):
+        parts = [
+            decode_array(section["polyline"])
+            for route in data.get("routes", [])
+            for section in route.get("sections", [])
+            if section.get("polyline")
+        ]
+        return np.concatenate(parts) if parts else np.empty((0, 2))
+
+    return decode_array(data)
+
+
 
 
 # call_here_api.py (just replace your old display_map with this)
 
 # in call_here_api.py
 
-def display_map(coords: List[Tuple[float, float]]):
+def display_map(coords, zoom: float = 11, max_vertices: Optional[int] = None):
+    """
+    Draw a route given as [(lat, lon), …] or an (N, 2|3) array. The route is
+    simplified for `zoom` first, so at most `max_vertices` points
+    (route_simplify.MAX_ROUTE_VERTICES by default) go to the browser.
+    """
     import pandas as pd
     import streamlit as st
     import pydeck as pdk
+    from route_simplify import MAX_ROUTE_VERTICES, simplify_route
 
-    if not coords:
+    if coords is None or len(coords) == 0:
         st.write("No route to display.")
         return
 
-    # Turn [(lat, lon), …] → [[ [lon, lat], … ]]
-    path = [[[lon, lat] for lat, lon in coords]]
+    route = simplify_route(coords, zoom, max_vertices or MAX_ROUTE_VERTICES)
+
+    # Turn (lat, lon) rows → [[ [lon, lat], … ]]
+    path = [route.points[:, [1, 0]].tolist()]
     df = pd.DataFrame({"path": path})
 
     # Draw the route in bright red
@@ -102,11 +371,11 @@ def display_map(coords: List[Tuple[float, float]]):
     )
 
     # Center on the first point
-    start_lat, start_lon = coords[0]
+    start_lat, start_lon = route.points[0, :2]
     view_state = pdk.ViewState(
-        latitude=start_lat,
-        longitude=start_lon,
-        zoom=11
+        latitude=float(start_lat),
+        longitude=float(start_lon),
+        zoom=zoom
     )
 
     # Use a light basemap style
@@ -117,3 +386,44 @@ def display_map(coords: List[Tuple[float, float]]):
     )
 
     st.pydeck_chart(deck)
+    st.caption(
+        f"Route drawn with {len(route.points)} of {route.original_count} vertices "
+        f"({route.reduction_ratio:.0%} removed by simplification)"
+    )
+
+
+def display_points_map(center: Tuple[float, float], points, zoom: float = 11):
+    """
+    Draw `center` (red) with `points` (blue) around it. `points` are
+    spatial_index.Neighbour rows whose `data` carries a customer name.
+    """
+    import pandas as pd
+    import streamlit as st
+    import pydeck as pdk
+
+    df = pd.DataFrame(
+        [{"lat": center[0], "lon": center[1], "label": "Prospect", "color": [255, 0, 0]}]
+        + [
+            {"lat": p.lat, "lon": p.lon, "label": f"{(p.data or {}).get('name', p.key)} · {p.distance_km:.1f} km",
+             "color": [0, 90, 200]}
+            for p in points
+        ]
+    )
+    layer = pdk.Layer(
+        "ScatterplotLayer",
+        data=df,
+        pickable=True,
+        get_position=["lon", "lat"],
+        get_fill_color="color",
+        get_radius=120,
+        radius_min_pixels=5,
+        radius_max_pixels=12,
+    )
+    view_state = pdk.ViewState(latitude=float(center[0]), longitude=float(center[1]), zoom=zoom)
+    deck = pdk.Deck(
+        layers=[layer],
+        initial_view_state=view_state,
+        map_style="mapbox://styles/mapbox/light-v9",
+        tooltip={"text": "{label}"},
+    )
+    st.pydeck_chart(deck)
@@ -1,45 +1,122 @@
 #call_precisely_api.py 
 import streamlit as st
-import _snowflake
-import requests
+import http_client
+import tracing
+from clients import get_secret
 import os
 import base64
+import threading
+import time
+from typing import Optional, Tuple
 
 # ── Precisely Demographics By Address helper ───────────────────────────────
 PRECISELY_DEMO_URL = "https://api.precisely.com/demographics-segmentation/v1/basic/demographics" # :contentReference[oaicite:0]{index=0}
 
 PRECISELY_AUTH_URL = "https://api.precisely.com/oauth/token"
 
-#Precisely precisely_api_key vs precisely_api_secret??
+# client id / secret are read from the bound secrets on the first token request
 
-api_key = _snowflake.get_generic_secret_string("precisely_api_key")
-#os.environ["precisely_api_key"] = secret
+TOKEN_REFRESH_MARGIN = 60    # seconds before expiry when a background refresh starts
+TOKEN_DEFAULT_TTL    = 3600  # used when the auth response has no expires_in
 
-api_secret = _snowflake.get_generic_secret_string("precisely_api_secret")
-#os.environ["precisely_api_key"] = secret
-
-
-def get_access_token(api_key, api_secret, auth_url):
 
+def request_access_token(api_key, api_secret, auth_url) -> Tuple[str, float]:
+    """Run the client-credentials flow; returns (access_token, expires_in seconds)."""
     credentials = f"{api_key}:{api_secret}"
-    st.error(f"Credetials: {credentials}")
     encoded_credentials = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
     headers = {
         'Authorization': f'Basic {encoded_credentials}',
         'Content-Type': 'application/x-www-form-urlencoded'
     }
     data = {'grant_type': 'client_credentials', 'scope': 'default'}
-    response = requests.post(auth_url, headers=headers, data=data)
-    print(f"Response: {response.json()}")
+    with tracing.span("precisely.token", kind="precisely") as sp:
+        response = http_client.post(auth_url, headers=headers, data=data)
+        sp.response(response)
     response.raise_for_status()
-    access_token = response.json().get('access_token')
-    print(f"Access token fetched: {access_token}")
-    st.error(f"Response: {response.json()}")
-    return access_token
+    body = response.json()
+    return body.get('access_token'), float(body.get('expires_in') or TOKEN_DEFAULT_TTL)
 
 
-def call_precisely_demographics(address: str) -> dict:
-    token = get_access_token(api_key, api_secret, PRECISELY_AUTH_URL)
+def get_access_token(api_key, api_secret, auth_url):
+    return request_access_token(api_key, api_secret, auth_url)[0]
+
+
+class TokenCache:
+    """
+    Thread-safe holder for the Precisely bearer token.
+    - honours expires_in
+    - within TOKEN_REFRESH_MARGIN of expiry, returns the current token and
+      refreshes in a background thread
+    - only one refresh is ever in flight; concurrent callers wait for it
+    """
+
+    def __init__(self, fetch, margin: float = TOKEN_REFRESH_MARGIN):
+        self._fetch      = fetch
+        self._margin     = margin
+        self._lock       = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._inflight: Optional[threading.Event] = None
+        self._error: Optional[Exception] = None
+
+    def get(self) -> str:
+        now = time.monotonic()
+        with self._lock:
+            token, expires_at = self._token, self._expires_at
+        if token and now < expires_at - self._margin:
+            return token
+        if token and now < expires_at:
+            self._start_background_refresh()
+            return token
+        return self._refresh()
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """Drop the cached token (only if it is still `token`, when given)."""
+        with self._lock:
+            if token is None or token == self._token:
+                self._token, self._expires_at = None, 0.0
+
+    def _start_background_refresh(self) -> None:
+        with self._lock:
+            if self._inflight is not None:
+                return
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self) -> str:
+        with self._lock:
+            event  = self._inflight
+            leader = event is None
+            if leader:
+                event = self._inflight = threading.Event()
+                self._error = None
+        if leader:
+            try:
+                token, expires_in = self._fetch()
+                with self._lock:
+                    self._token, self._expires_at = token, time.monotonic() + expires_in
+            except Exception as e:
+                self._error = e
+            finally:
+                with self._lock:
+                    self._inflight = None
+                event.set()
+        else:
+            event.wait()
+
+        with self._lock:
+            if self._token and time.monotonic() < self._expires_at:
+                return self._token
+        raise self._error or RuntimeError("Precisely token refresh failed")
+
+
+_token_cache = TokenCache(lambda: request_access_token(
+    get_secret("precisely_api_key"), get_secret("precisely_api_secret"), PRECISELY_AUTH_URL
+))
+
+
+def request_demographics(address: str) -> dict:
+    """Raw Precisely demographics JSON for `address`; raises on HTTP errors."""
+    token = _token_cache.get()
     params = {
         "address": address,
         "country": "USA",
@@ -47,9 +124,23 @@ def call_precisely_demographics(address: str) -> dict:
         "variableLevel": "Key",
     }
     headers = {'Authorization': f'Bearer {token}'}
-    resp = requests.get(PRECISELY_DEMO_URL, params=params, headers=headers, timeout=30)
-    if resp.status_code == 200:
-        return resp.json()
-    st.error(f"Demographics API error {resp.status_code}: {resp.text}")
-    return {}
+    with tracing.span("precisely.demographics", kind="precisely") as sp:
+        resp = http_client.get(PRECISELY_DEMO_URL, params=params, headers=headers)
+        if resp.status_code == 401:
+            # token revoked or expired early: drop it and retry once with a fresh one
+            _token_cache.invalidate(token)
+            headers = {'Authorization': f'Bearer {_token_cache.get()}'}
+            resp = http_client.get(PRECISELY_DEMO_URL, params=params, headers=headers)
+        sp.response(resp)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def call_precisely_demographics(address: str) -> dict:
+    from requests import HTTPError
 
+    try:
+        return request_demographics(address)
+    except HTTPError as e:
+        st.error(f"Demographics API error {e.response.status_code}: {e.response.text}")
+        return {}
@@ -0,0 +1,53 @@
+# clients.py
+"""
+Process-wide handles to the Snowpark session and the Snowflake secrets,
+created on first use instead of at import. Importing an app module is then
+free of Snowflake round-trips, and a page that never calls HERE or Precisely
+never reads their secrets.
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+_lock = threading.Lock()
+_session = None
+_secrets: Dict[str, str] = {}
+
+
+def get_session():
+    """The active Snowpark session, looked up once per process."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                from snowflake.snowpark.context import get_active_session
+
+                _session = get_active_session()
+    return _session
+
+
+def set_session(session) -> None:
+    """Use `session` from now on (a stored procedure or task handler's own session)."""
+    global _session
+    with _lock:
+        _session = session
+
+
+def get_secret(name: str) -> str:
+    """
+    A generic string secret bound to the app (e.g. "here_api_key"), read once
+    per process. Outside Snowflake (a worker run locally) it is read from the
+    environment variable of the same name in upper case (HERE_API_KEY).
+    """
+    value: Optional[str] = _secrets.get(name)
+    if value is None:
+        with _lock:
+            value = _secrets.get(name)
+            if value is None:
+                try:
+                    import _snowflake
+                except ImportError:
+                    value = _secrets[name] = os.environ[name.upper()]
+                else:
+                    value = _secrets[name] = _snowflake.get_generic_secret_string(name)
+    return value
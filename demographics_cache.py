@@ -0,0 +1,111 @@
+# demographics_cache.py
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable
+
+from clients import get_session
+from call_precisely_api import request_demographics
+from geocode_cache import CUSTOMERS_TABLE, normalize_address
+from rate_limit import get_bucket
+from table_cache import TableCache
+
+DEMOGRAPHICS_CACHE_TABLE = "DEMOGRAPHICS_CACHE_WEBINAR_202508"
+DEMOGRAPHICS_TTL         = 180 * 24 * 3600  # seconds; the data changes yearly
+DEMOGRAPHICS_LRU_SIZE    = 2_000
+PREWARM_MAX_WORKERS      = 4
+
+_cache = TableCache(
+    "demographics",
+    DEMOGRAPHICS_CACHE_TABLE,
+    columns=[("variables", "PARSE_JSON({})")],
+    encode=lambda variables: [json.dumps(variables)],
+    decode=lambda row: json.loads(row["VARIABLES"]) if row["VARIABLES"] else {},
+    key=normalize_address,
+    ttl=DEMOGRAPHICS_TTL,
+    maxsize=DEMOGRAPHICS_LRU_SIZE,
+)
+_stats = {"api_calls": 0}
+
+
+def project_demographics(raw: Dict) -> Dict[str, Dict[str, str]]:
+    """
+    Keep only the key variables of a Precisely response:
+    {theme: {variable description: value}}. Range variables are flattened
+    as "<range description> / <field description>".
+    """
+    out: Dict[str, Dict[str, str]] = {}
+    for theme, body in (raw.get("themes") or {}).items():
+        if not isinstance(body, dict):
+            continue
+        values: Dict[str, str] = {}
+        for var in body.get("individualValueVariable") or []:
+            values[var.get("description") or var.get("name")] = var.get("value")
+        for rng in body.get("rangeVariable") or []:
+            label = rng.get("description") or rng.get("name")
+            for field in rng.get("field") or []:
+                values[f"{label} / {field.get('description') or field.get('name')}"] = field.get("value")
+        if values:
+            out[theme] = values
+    return out
+
+
+def lookup_many(addresses: Iterable[str]) -> Dict[str, Dict]:
+    """Cached projected demographics (see TableCache.lookup_many)."""
+    return _cache.lookup_many(addresses)
+
+
+def store_many(results: Dict[str, Dict]) -> None:
+    """Write projected demographics to both tiers; the table in a single MERGE."""
+    _cache.store_many(results)
+
+
+def fetch_demographics(address: str) -> Dict:
+    """Projected demographics straight from Precisely, bypassing the cache."""
+    get_bucket("precisely").acquire()
+    _stats["api_calls"] += 1
+    return project_demographics(request_demographics(address))
+
+
+def get_demographics(address: str) -> Dict:
+    """
+    Projected demographics for `address` through the cache.
+    Empty results are returned but not cached.
+    """
+    hit = lookup_many([address])
+    if address in hit:
+        return hit[address]
+    variables = fetch_demographics(address)
+    if variables:
+        store_many({address: variables})
+    return variables
+
+
+def prewarm_demographics_cache(max_workers: int = PREWARM_MAX_WORKERS) -> int:
+    """
+    Fill the cache for every customer address: one lookup for what is already
+    cached, rate-limited parallel Precisely calls for the rest, one MERGE.
+    Returns the number of addresses fetched from Precisely.
+    """
+    rows = get_session().sql(
+        f"SELECT DISTINCT full_address FROM {CUSTOMERS_TABLE} WHERE full_address IS NOT NULL"
+    ).collect()
+    addresses = [r["FULL_ADDRESS"] for r in rows]
+    cached    = lookup_many(addresses)
+    misses    = [a for a in addresses if a not in cached]
+
+    fresh: Dict[str, Dict] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_demographics, a): a for a in misses}
+        for fut in as_completed(futures):
+            try:
+                variables = fut.result()
+            except Exception:
+                continue  # leave it for the next prewarm / on-demand lookup
+            if variables:
+                fresh[futures[fut]] = variables
+    store_many(fresh)
+    return len(fresh)
+
+
+def cache_stats() -> Dict[str, int]:
+    return {**_cache.stats(), **_stats}
@@ -0,0 +1,40 @@
+# dispatch.py
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Tuple
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import tracing
+
+DISPATCH_MAX_WORKERS = 6
+
+# lives in an imported module so it survives Streamlit reruns; a job that is
+# discarded (e.g. the agent call when the query turned out to be an address)
+# finishes in the background without holding up the next run
+_pool = ThreadPoolExecutor(max_workers=DISPATCH_MAX_WORKERS, thread_name_prefix="dispatch")
+
+
+def submit(fn: Callable, *args, **kwargs) -> Future:
+    """
+    Run fn(*args, **kwargs) on the shared pool. The caller's script-run context
+    is attached to the worker thread so st.* calls made by fn land in this run,
+    and its tracing context is carried over so fn's spans join this rerun.
+    """
+    ctx = get_script_run_ctx()
+    traced = tracing.bind(fn)
+
+    def job():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return traced(*args, **kwargs)
+
+    return _pool.submit(job)
+
+
+def timed(fn: Callable, *args, **kwargs) -> Tuple[Any, float]:
+    """(fn(*args, **kwargs), elapsed seconds)."""
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - t0
@@ -0,0 +1,113 @@
+# enrichment.py
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import dispatch
+from demographics_cache import get_demographics
+from geocode_cache import geocode_cached
+from route_cache import get_route
+
+ENRICHMENT_DEADLINE = 25.0  # seconds for the whole pipeline
+CALL_TIMEOUTS = {           # seconds per call, counted from when it starts
+    "geocode":      8.0,
+    "demographics": 12.0,
+    "route":        12.0,
+}
+QUEUED_POLL_INTERVAL = 0.1  # seconds between checks while a call waits for a dispatch worker
+
+
+class EnrichmentEvent(NamedTuple):
+    kind: str               # "geocode" | "demographics" | "route"
+    key: object             # address index for geocode, address for demographics, None for route
+    value: object           # (lat, lon) / projected demographics / route ndarray; None on failure
+    error: Optional[str]
+    seconds: float
+
+
+def _route(origin: Tuple[float, float], destination: Tuple[float, float]):
+    route = get_route(origin, destination)
+    if route is None:
+        raise ValueError("HERE found no route between the two addresses")
+    return route.points()
+
+
+def enrich_addresses(
+    addresses: List[str],
+    demographics_for: Optional[str] = None,
+    deadline: float = ENRICHMENT_DEADLINE,
+    timeouts: Optional[Dict[str, float]] = None,
+) -> Iterator[EnrichmentEvent]:
+    """
+    Geocode every address and look up demographics for `demographics_for`, all
+    concurrently; for a two-address query the route is requested as soon as
+    both coordinates are in. Events are yielded as each call finishes, so the
+    caller can render partial results. A call that outlives its timeout, or is
+    still running (or still queued behind other dispatch jobs) at `deadline`,
+    is yielded as timed out and abandoned. Per-call timeouts count from when
+    the call starts on a worker, not from when it is submitted.
+    """
+    timeouts = {**CALL_TIMEOUTS, **(timeouts or {})}
+    t0 = time.monotonic()
+    # future -> (kind, key, submitted at, [started at] once a worker picks it up)
+    pending: Dict[Future, Tuple[str, object, float, List[float]]] = {}
+
+    def start(kind, key, fn, *args):
+        began: List[float] = []
+
+        def job():
+            began.append(time.monotonic())
+            return fn(*args)
+
+        pending[dispatch.submit(job)] = (kind, key, time.monotonic(), began)
+
+    for i, addr in enumerate(addresses):
+        start("geocode", i, geocode_cached, addr)
+    if demographics_for:
+        start("demographics", demographics_for, get_demographics, demographics_for)
+
+    coords: Dict[int, Tuple[float, float]] = {}
+    geocodes_left = len(addresses)
+    while pending:
+        now = time.monotonic()
+        expiry = {
+            fut: min(began[0] + timeouts[kind], t0 + deadline) if began else t0 + deadline
+            for fut, (kind, _, _, began) in pending.items()
+        }
+        wake = min(expiry.values())
+        if not all(began for _, _, _, began in pending.values()):
+            wake = min(wake, now + QUEUED_POLL_INTERVAL)  # a queued call gets its own timeout once it starts
+        done, _ = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+
+        for fut in list(pending):
+            kind, key, submitted, began = pending[fut]
+            started = began[0] if began else submitted
+            if fut in done:
+                del pending[fut]
+                try:
+                    value, error = fut.result(), None
+                except Exception as e:
+                    value, error = None, str(e)
+            elif now >= expiry[fut]:
+                del pending[fut]
+                fut.cancel()  # no-op if running; the result is simply dropped
+                if began:
+                    value, error = None, f"timed out after {now - started:.1f}s"
+                else:
+                    value, error = None, f"not started after {now - submitted:.1f}s (all workers busy)"
+            else:
+                continue
+            yield EnrichmentEvent(kind, key, value, error, now - started)
+
+            if kind == "geocode":
+                geocodes_left -= 1
+                if value is not None and None not in value:
+                    coords[key] = value
+                if len(addresses) == 2 and geocodes_left == 0:
+                    if len(coords) == 2:
+                        start("route", None, _route, coords[0], coords[1])
+                    else:
+                        yield EnrichmentEvent(
+                            "route", None, None, "Could not geocode one or both addresses.", 0.0
+                        )
@@ -6,8 +6,8 @@
 from .encoding import _dict_to_tuple, ABSENT, ALTITUDE, LEVEL, ELEVATION, CUSTOM1, CUSTOM2
 from .decoding import THIRD_DIM_MAP, get_third_dimension
 
-from .decoding import iter_decode
-from .encoding import encode
+from .decoding import iter_decode, decode_array
+from .encoding import encode, encode_array
 
 
 def dict_encode(coordinates, precision=5, third_dim=ABSENT, third_dim_precision=0):
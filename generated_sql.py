@@ -0,0 +1,155 @@
+# generated_sql.py
+import hashlib
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+from clients import get_session
+import tracing
+from ttl_cache import TTLCache
+
+GENERATED_SQL_ROW_CAP  = 1_000   # rows shown at first; "load more" adds as many again
+GENERATED_SQL_MAX_ROWS = 20_000  # hard ceiling, whatever "load more" asks for
+STATEMENT_TIMEOUT      = 60      # seconds, enforced server-side
+RESULT_CACHE_SIZE      = 32
+RESULT_TTL             = 15 * 60  # seconds
+VERSION_TTL            = 30       # seconds between LAST_ALTERED checks of the same tables
+
+_IDENT = r'(?:"[^"]+"|[A-Za-z_][\w$]*)'
+_TABLE_REF = re.compile(rf"\b(?:from|join)\s+({_IDENT}(?:\.{_IDENT}){{0,2}})", re.IGNORECASE)
+
+
+class QueryResult(NamedTuple):
+    frame: pd.DataFrame
+    truncated: bool   # more rows exist beyond frame
+    cached: bool
+    seconds: float
+
+
+_results  = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_TTL)
+_versions = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=VERSION_TTL)
+
+
+def clean_sql(sql: str) -> str:
+    return (sql or "").strip().rstrip(";").strip()
+
+
+def _unquote(ident: str) -> str:
+    return ident[1:-1] if ident.startswith('"') else ident.upper()
+
+
+def referenced_tables(sql: str) -> List[Tuple[str, ...]]:
+    """(database?, schema?, table) parts of every FROM / JOIN target, identifiers resolved."""
+    refs = []
+    for m in _TABLE_REF.finditer(sql):
+        parts = tuple(_unquote(p) for p in re.findall(_IDENT, m.group(1)))
+        if parts not in refs:
+            refs.append(parts)
+    return refs
+
+
+def tables_version(sql: str) -> Optional[str]:
+    """
+    LAST_ALTERED of the tables the query reads, from INFORMATION_SCHEMA (one
+    query per database). Each table is matched in its own schema, or in
+    CURRENT_SCHEMA() when the reference is unqualified; CTE names simply find
+    no match. Memoized for VERSION_TTL. None when the metadata cannot be read
+    (then the result is not cached).
+    """
+    refs = referenced_tables(sql)
+    if not refs:
+        return ""
+    memo_key = repr(refs)
+    version = _versions.get(memo_key)
+    if version is not None:
+        return version
+
+    by_db: Dict[str, List[Tuple[str, ...]]] = {}
+    for parts in refs:
+        db = parts[0] if len(parts) == 3 else ""
+        by_db.setdefault(db, []).append(parts[-2:])
+    stamps = []
+    for db, tables in sorted(by_db.items()):
+        prefix = f'"{db}".' if db else ""
+        conditions, params = [], []
+        for parts in tables:
+            if len(parts) == 2:
+                conditions.append("(table_schema = ? AND table_name = ?)")
+                params += list(parts)
+            else:
+                conditions.append("(table_schema = CURRENT_SCHEMA() AND table_name = ?)")
+                params.append(parts[0])
+        try:
+            rows = get_session().sql(
+                f"""
+                SELECT table_catalog, table_schema, table_name, last_altered
+                FROM {prefix}information_schema.tables
+                WHERE {" OR ".join(conditions)}
+                """,
+                params=params,
+            ).collect()
+        except Exception:
+            return None
+        stamps += sorted(
+            f"{r['TABLE_CATALOG']}.{r['TABLE_SCHEMA']}.{r['TABLE_NAME']}@{r['LAST_ALTERED']}"
+            for r in rows
+        )
+    version = "|".join(stamps)
+    _versions.set(memo_key, version)
+    return version
+
+
+def run_generated_sql(
+    sql: str,
+    max_rows: int = GENERATED_SQL_ROW_CAP,
+    timeout: int = STATEMENT_TIMEOUT,
+    use_cache: bool = True,
+) -> QueryResult:
+    """
+    Run agent-generated SQL and return at most `max_rows` rows. Arrow result
+    batches are pulled only until the cap is reached, so a huge result never
+    reaches this process; the statement is cancelled by Snowflake after
+    `timeout` seconds. Results are cached on the SQL text and the
+    LAST_ALTERED of its tables, unless those cannot be read. Errors of the
+    query itself are raised to the caller.
+    """
+    sql      = clean_sql(sql)
+    max_rows = max(1, min(max_rows, GENERATED_SQL_MAX_ROWS))
+    t0       = time.perf_counter()
+    version  = tables_version(sql)
+    key      = (hashlib.sha256(sql.encode("utf-8")).hexdigest(), version)
+    use_cache = use_cache and version is not None
+
+    if use_cache:
+        hit = _results.get(key)
+        # a cached prefix serves any smaller cap, or any cap when it was already complete
+        if hit is not None and (len(hit.frame) >= max_rows or not hit.truncated):
+            with tracing.span("sql.generated", kind="sql") as sp:
+                sp.set(rows=min(len(hit.frame), max_rows), cache_hit=True)
+            return QueryResult(
+                hit.frame.head(max_rows),
+                hit.truncated or len(hit.frame) > max_rows,
+                True,
+                time.perf_counter() - t0,
+            )
+
+    frames, n = [], 0
+    with tracing.span("sql.generated", kind="sql") as sp:
+        batches = get_session().sql(sql).to_pandas_batches(
+            statement_params={"STATEMENT_TIMEOUT_IN_SECONDS": int(timeout)}
+        )
+        for batch in batches:
+            frames.append(batch)
+            n += len(batch)
+            if n > max_rows:
+                break  # one row past the cap is enough to know there is more
+        sp.set(rows=n, cache_hit=False)
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    truncated = len(frame) > max_rows
+    frame = frame.head(max_rows)
+
+    result = QueryResult(frame, truncated, False, time.perf_counter() - t0)
+    if version is not None:
+        _results.set(key, result)
+    return result
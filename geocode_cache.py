@@ -0,0 +1,179 @@
+# geocode_cache.py
+import re
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from clients import get_session
+from call_here_api import (
+    BATCH_POLL_INTERVAL,
+    BATCH_TIMEOUT,
+    GEOCODE_MAX_WORKERS,
+    call_geocoding_here_api,
+    iter_geocode_many,
+    run_batch_geocode,
+)
+from table_cache import TableCache
+
+GEOCODE_CACHE_TABLE = "GEOCODE_CACHE_WEBINAR_202508"
+CUSTOMERS_TABLE     = "CUSTOMERS_WEBINAR_202508"
+GEOCODE_PROVIDER    = "HERE"
+GEOCODE_TTL         = 30 * 24 * 3600  # seconds
+GEOCODE_LRU_SIZE    = 10_000
+
+LatLon = Tuple[Optional[float], Optional[float]]
+
+_stats = {"http_calls": 0}
+
+
+def normalize_address(address: str) -> str:
+    """Cache key for an address: lower-case, no punctuation, single spaces."""
+    key = re.sub(r"[^\w\s]", " ", (address or "").lower())
+    return re.sub(r"\s+", " ", key).strip()
+
+
+# normalize_address() of `c.full_address` in SQL, to join customers to the cache
+_ADDRESS_KEY_SQL = (
+    "TRIM(REGEXP_REPLACE(REGEXP_REPLACE(LOWER(c.full_address), "
+    "'[^[:alnum:]_[:space:]]', ' '), '[[:space:]]+', ' '))"
+)
+
+# Customers with their coordinates: the stored LATITUDE/LONGITUDE when set,
+# else the geocode cache entry of their address. UPDATED_AT also moves when
+# the cache entry is (re)fetched, so incremental readers see new geocodes.
+CUSTOMER_COORDINATES_SQL = f"""
+    SELECT c.email_address, c.name, c.full_address,
+           IFF(c.latitude IS NOT NULL AND c.longitude IS NOT NULL, c.latitude,  g.lat) AS latitude,
+           IFF(c.latitude IS NOT NULL AND c.longitude IS NOT NULL, c.longitude, g.lon) AS longitude,
+           GREATEST(c.updated_at, COALESCE(g.fetched_at::TIMESTAMP_NTZ, c.updated_at)) AS updated_at
+    FROM {CUSTOMERS_TABLE} c
+    LEFT JOIN {GEOCODE_CACHE_TABLE} g ON g.address_key = {_ADDRESS_KEY_SQL}
+"""
+
+
+# in-process tier in front of the Snowflake table, keyed by normalize_address()
+_cache = TableCache(
+    "geocode",
+    GEOCODE_CACHE_TABLE,
+    columns=[("lat", "{}::FLOAT"), ("lon", "{}::FLOAT")],
+    encode=list,
+    decode=lambda row: (row["LAT"], row["LON"]),
+    key=normalize_address,
+    ttl=GEOCODE_TTL,
+    maxsize=GEOCODE_LRU_SIZE,
+    constants={"provider": f"'{GEOCODE_PROVIDER}'"},
+)
+
+
+def position_from_here(geo: Dict) -> LatLon:
+    """Pull (lat, lon) of the first item of a HERE geocode response."""
+    items = geo.get("items") or []
+    if not items:
+        return None, None
+    pos = items[0]["position"]
+    return pos["lat"], pos["lng"]
+
+
+def lookup_many(addresses: Iterable[str]) -> Dict[str, LatLon]:
+    """
+    Return cached coordinates for the given addresses (see TableCache.lookup_many).
+    A cached (None, None) means HERE found nothing for that address.
+    """
+    return _cache.lookup_many(addresses)
+
+
+def store_many(results: Dict[str, LatLon]) -> None:
+    """Write fresh geocodes to both tiers; the table in a single MERGE."""
+    _cache.store_many(results)
+
+
+def fetch_geocode(address: str) -> LatLon:
+    """Geocode one address through HERE, bypassing the cache."""
+    _stats["http_calls"] += 1
+    return position_from_here(call_geocoding_here_api(address))
+
+
+def iter_geocode_many_cached(
+    addresses: Iterable[str],
+    max_workers: int = GEOCODE_MAX_WORKERS,
+) -> Iterator[Tuple[str, LatLon]]:
+    """
+    Geocode a batch of addresses through the cache and yield (address, (lat, lon))
+    as results become available: cache hits first (one bulk lookup), then HERE
+    results for the misses as the parallel requests complete. Everything fetched
+    is written back in one MERGE once the batch is done.
+    Addresses that fail to geocode yield (None, None) and are not cached.
+    """
+    addresses = list(dict.fromkeys(addresses))
+    hits = lookup_many(addresses)
+    yield from hits.items()
+
+    fresh: Dict[str, LatLon] = {}
+    misses = [a for a in addresses if a not in hits]
+    try:
+        for addr, geo, err in iter_geocode_many(misses, max_workers):
+            _stats["http_calls"] += 1
+            if err is not None:
+                yield addr, (None, None)
+                continue
+            fresh[addr] = position_from_here(geo)
+            yield addr, fresh[addr]
+    finally:
+        store_many(fresh)
+
+
+def geocode_many_cached(addresses: Iterable[str]) -> Dict[str, LatLon]:
+    """Collect iter_geocode_many_cached() into {address: (lat, lon)}."""
+    return dict(iter_geocode_many_cached(addresses))
+
+
+def geocode_cached(address: str) -> LatLon:
+    """Single-address variant of geocode_many_cached()."""
+    hit = lookup_many([address])
+    if address in hit:
+        return hit[address]
+    latlon = fetch_geocode(address)
+    store_many({address: latlon})
+    return latlon
+
+
+def batch_geocode_customers(
+    only_missing: bool = True,
+    poll_interval: float = BATCH_POLL_INTERVAL,
+    timeout: float = BATCH_TIMEOUT,
+) -> int:
+    """
+    Bulk path for customer imports (run by geocode_worker.py): geocode customer
+    addresses with one HERE batch job and write LATITUDE/LONGITUDE back to the
+    customers table in a single MERGE (results also warm the geocode cache).
+    Returns the number of addresses geocoded.
+    """
+    from snowflake.snowpark.functions import current_timestamp, when_matched
+
+    where = "WHERE latitude IS NULL OR longitude IS NULL" if only_missing else ""
+    rows  = get_session().sql(
+        f"SELECT DISTINCT full_address FROM {CUSTOMERS_TABLE} {where}"
+    ).collect()
+    results = run_batch_geocode((r["FULL_ADDRESS"] for r in rows if r["FULL_ADDRESS"]), poll_interval, timeout)
+    if not results:
+        return 0
+
+    session = get_session()
+    source = session.create_dataframe(
+        [[addr, lat, lon] for addr, (lat, lon) in results.items()],
+        schema=["FULL_ADDRESS", "LATITUDE", "LONGITUDE"],
+    )
+    target = session.table(CUSTOMERS_TABLE)
+    target.merge(
+        source,
+        target["FULL_ADDRESS"] == source["FULL_ADDRESS"],
+        [when_matched().update({
+            "LATITUDE":   source["LATITUDE"],
+            "LONGITUDE":  source["LONGITUDE"],
+            "UPDATED_AT": current_timestamp(),
+        })],
+    )
+    store_many(results)
+    return len(results)
+
+
+def cache_stats() -> Dict[str, int]:
+    return {**_cache.stats(), **_stats}
@@ -0,0 +1,72 @@
+# geocode_worker.py
+"""
+Bulk geocoding of customer addresses, off the interactive path.
+
+Customers without coordinates are geocoded with one asynchronous HERE batch
+job (geocode_cache.batch_geocode_customers): the job is submitted, polled
+until it completes, and LATITUDE/LONGITUDE are written back to the customers
+table in a single MERGE. The results also fill the geocode cache, so the
+app's maps and the nearby-customer overlay find them without calling HERE.
+
+    python geocode_worker.py                # customers without coordinates
+    python geocode_worker.py --all          # re-geocode every customer
+    python geocode_worker.py --loop --interval 3600
+
+It can also run as a stored procedure / task handler through run(session),
+with the here_api_key secret bound to the procedure.
+"""
+import argparse
+import time
+
+from call_here_api import BATCH_POLL_INTERVAL, BATCH_TIMEOUT
+from clients import set_session
+from geocode_cache import batch_geocode_customers
+
+
+def run(
+    session,
+    only_missing: bool = True,
+    poll_interval: float = BATCH_POLL_INTERVAL,
+    timeout: float = BATCH_TIMEOUT,
+) -> int:
+    """
+    Geocode customer addresses once with `session` (registered with
+    clients.set_session, so every query goes through it); returns the number
+    of addresses geocoded.
+    """
+    set_session(session)
+    return batch_geocode_customers(only_missing, poll_interval, timeout)
+
+
+def _get_session():
+    from snowflake.snowpark import Session
+    from snowflake.snowpark.context import get_active_session
+
+    try:
+        return get_active_session()
+    except Exception:
+        return Session.builder.getOrCreate()  # default connection from connections.toml
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--all", action="store_true", help="re-geocode customers that already have coordinates")
+    parser.add_argument("--poll-interval", type=float, default=BATCH_POLL_INTERVAL,
+                        help="seconds between batch job status checks")
+    parser.add_argument("--timeout", type=float, default=BATCH_TIMEOUT,
+                        help="seconds before a batch job is given up")
+    parser.add_argument("--loop", action="store_true", help="keep geocoding new customers")
+    parser.add_argument("--interval", type=float, default=3600, help="seconds between runs with --loop")
+    args = parser.parse_args(argv)
+
+    session = _get_session()
+    while True:
+        n = run(session, not args.all, args.poll_interval, args.timeout)
+        print(f"coordinates written for {n} customer addresses")
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# http_client.py
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests  # imported by _build_session() on the first HTTP call, not at app start
+
+# Pool sizing: one urllib3 pool per host, each keeping up to HTTP_POOL_MAXSIZE
+# idle keep-alive connections (match it to the widest thread pool using it).
+HTTP_POOL_CONNECTIONS = 8          # number of per-host pools kept
+HTTP_POOL_MAXSIZE     = 16         # connections kept alive per host
+HTTP_TIMEOUT          = (5, 30)    # (connect, read) seconds
+
+_session: Optional["requests.Session"] = None
+_lock = threading.Lock()
+_pools_seen: Dict[int, object] = {}  # id -> urllib3 pool, kept after eviction for stats
+
+
+def configure(
+    pool_connections: int = HTTP_POOL_CONNECTIONS,
+    pool_maxsize: int = HTTP_POOL_MAXSIZE,
+    timeout: Tuple[float, float] = HTTP_TIMEOUT,
+) -> None:
+    """(Re)build the shared session with new pool sizes and default timeout."""
+    global _session, HTTP_TIMEOUT
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = _build_session(pool_connections, pool_maxsize)
+        HTTP_TIMEOUT = timeout
+        _pools_seen.clear()
+
+
+def _build_session(pool_connections: int, pool_maxsize: int) -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection":      "keep-alive",
+    })
+    return session
+
+
+def get_session() -> "requests.Session":
+    """Process-wide session shared by every HERE and Precisely call."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session(HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE)
+    return _session
+
+
+def request(method: str, url: str, **kwargs) -> "requests.Response":
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    resp = get_session().request(method, url, **kwargs)
+    _remember_pools(url)
+    return resp
+
+
+def get(url: str, **kwargs) -> "requests.Response":
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> "requests.Response":
+    return request("POST", url, **kwargs)
+
+
+def _remember_pools(url: str) -> None:
+    manager = get_session().get_adapter(url).poolmanager
+    for key in manager.pools.keys():
+        pool = manager.pools.get(key)
+        if pool is not None:
+            _pools_seen.setdefault(id(pool), pool)
+
+
+def connection_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Per-host connection reuse: requests sent, TCP/TLS connections opened and
+    requests that rode on an existing keep-alive connection.
+    """
+    stats: Dict[str, Dict[str, int]] = {}
+    for pool in list(_pools_seen.values()):
+        host = stats.setdefault(f"{pool.host}:{pool.port}", {"requests": 0, "connections": 0})
+        host["requests"]    += pool.num_requests
+        host["connections"] += pool.num_connections
+    for host in stats.values():
+        host["reused"] = max(host["requests"] - host["connections"], 0)
+    return stats
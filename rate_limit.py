@@ -0,0 +1,49 @@
+# rate_limit.py
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, bursts up to `capacity`.
+    acquire() blocks until a token is available; safe to share across threads.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate     = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens  = self.capacity
+        self._updated = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# requests per second allowed for each external provider
+PROVIDER_RATES = {
+    "here":      5.0,
+    "precisely": 2.0,
+}
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(provider: str) -> TokenBucket:
+    """Process-wide token bucket for `provider`, created on first use."""
+    with _buckets_lock:
+        bucket = _buckets.get(provider)
+        if bucket is None:
+            bucket = _buckets[provider] = TokenBucket(PROVIDER_RATES.get(provider, 1.0))
+        return bucket
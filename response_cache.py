@@ -0,0 +1,127 @@
+# response_cache.py
+import hashlib
+import json
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from clients import get_session
+import tracing
+from ttl_cache import TTLCache
+
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_TTL        = 3600   # seconds an answer is reused
+FINGERPRINT_TTL     = 60     # seconds between checks of the semantic model / search service
+
+
+class CachedAnswer(NamedTuple):
+    """A parsed answer: the (text, sql, citations) of process_sse_response."""
+    text: str
+    sql: str
+    citations: List[Dict]
+
+
+_answers      = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_TTL)
+_fingerprints = TTLCache(maxsize=16, ttl=FINGERPRINT_TTL)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Only runs of whitespace are collapsed: the model reads case and punctuation
+    ("IT customers" is not "it customers"), so they stay part of the key.
+    """
+    return re.sub(r"\s+", " ", prompt or "").strip()
+
+
+def _stage_file_version(stage_path: str) -> str:
+    """md5 and last_modified of a staged file, e.g. the semantic model YAML."""
+    rows = get_session().sql(f"LIST {stage_path}").collect()
+    return "|".join(f"{r['md5']}@{r['last_modified']}" for r in rows)
+
+
+def _search_service_version(qualified_name: str) -> str:
+    """created_on and refresh point of a Cortex Search service."""
+    *scope, name = qualified_name.split(".")
+    in_schema = f" IN SCHEMA {'.'.join(scope)}" if scope else ""
+    rows = get_session().sql(
+        f"SHOW CORTEX SEARCH SERVICES LIKE '{name.replace(chr(39), '')}'{in_schema}"
+    ).collect()
+    parts = []
+    for r in rows:
+        d = {k.lower(): v for k, v in r.as_dict().items()}
+        parts.append("|".join(str(d.get(k)) for k in ("created_on", "definition", "data_timestamp")))
+    return ";".join(parts)
+
+
+def sources_fingerprint(payload: Dict) -> Optional[str]:
+    """
+    Version of the semantic model files and search services the payload's tools
+    read from, so that answers are invalidated when either changes. Memoized for
+    FINGERPRINT_TTL. None when the metadata cannot be read (then nothing is cached).
+    """
+    resources = payload.get("tool_resources") or {}
+    sources = sorted(
+        ("model", r["semantic_model_file"]) if "semantic_model_file" in r else ("search", r["name"])
+        for r in resources.values()
+        if "semantic_model_file" in r or "name" in r
+    )
+    if not sources:
+        return ""
+    cache_key = json.dumps(sources)
+    fp = _fingerprints.get(cache_key)
+    if fp is None:
+        try:
+            fp = json.dumps([
+                _stage_file_version(src) if kind == "model" else _search_service_version(src)
+                for kind, src in sources
+            ])
+        except Exception:
+            return None
+        _fingerprints.set(cache_key, fp)
+    return fp
+
+
+def answer_key(payload: Dict) -> Optional[str]:
+    """
+    Cache key of an agent/completion request: normalized prompt, model, tool
+    configuration and the version of their sources. None if it cannot be built.
+    """
+    fingerprint = sources_fingerprint(payload)
+    if fingerprint is None:
+        return None
+    prompts = [
+        normalize_prompt(c.get("text", ""))
+        for m in payload.get("messages", [])
+        for c in m.get("content", [])
+        if c.get("type") == "text"
+    ]
+    config = {k: v for k, v in payload.items() if k != "messages"}
+    raw = json.dumps([prompts, config, fingerprint], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_answer(payload: Dict) -> Optional[CachedAnswer]:
+    with tracing.span("cache.response", kind="cache") as sp:
+        key    = answer_key(payload)
+        answer = None if key is None else _answers.get(key)
+        sp.set(cache_hit=answer is not None)
+    return answer
+
+
+def store_answer(payload: Dict, answer: CachedAnswer) -> None:
+    """Keep a successful answer; empty ones are not cached."""
+    if not (answer.text or answer.sql):
+        return
+    key = answer_key(payload)
+    if key is not None:
+        _answers.set(key, answer)
+
+
+def invalidate_responses() -> None:
+    """Drop every cached answer and source fingerprint."""
+    _answers.clear()
+    _fingerprints.clear()
+
+
+def response_cache_stats() -> Dict[str, int]:
+    stats = _answers.stats()
+    return {"size": stats["size"], "hits": stats["hits"], "misses": stats["misses"]}
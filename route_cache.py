@@ -0,0 +1,119 @@
+# route_cache.py
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from clients import get_session
+from call_here_api import call_routing_here_api, matrix_routes
+from flexpolyline import decode_array
+from geocode_cache import CUSTOMER_COORDINATES_SQL
+from rate_limit import get_bucket
+from ttl_cache import TTLCache
+
+ROUTE_COORD_PRECISION = 4              # decimals kept in the cache key (~11 m)
+ROUTE_TTL             = 7 * 24 * 3600  # seconds; road network changes are rare
+ROUTE_CACHE_SIZE      = 1_000
+
+LatLon = Tuple[float, float]
+
+_routes = TTLCache(maxsize=ROUTE_CACHE_SIZE, ttl=ROUTE_TTL)
+
+
+class RouteResult(NamedTuple):
+    polylines: Tuple[str, ...]   # one flexpolyline per route section
+    distance_m: float
+    duration_s: float
+
+    def points(self):
+        """Decoded (lat, lon) vertices of every section as one numpy array."""
+        import numpy as np
+
+        parts = [decode_array(p) for p in self.polylines]
+        return np.concatenate(parts) if parts else np.empty((0, 2))
+
+
+def round_coord(point: LatLon, precision: int = ROUTE_COORD_PRECISION) -> LatLon:
+    return (round(float(point[0]), precision), round(float(point[1]), precision))
+
+
+def route_key(
+    origin: LatLon,
+    destination: LatLon,
+    transport_mode: str = "car",
+    precision: int = ROUTE_COORD_PRECISION,
+) -> tuple:
+    return (round_coord(origin, precision), round_coord(destination, precision), transport_mode)
+
+
+def route_from_here(here_json: Dict) -> Optional[RouteResult]:
+    """First route of a Routing v8 response (return=polyline,summary); None if there is none."""
+    routes = here_json.get("routes") or []
+    if not routes:
+        return None
+    sections = routes[0].get("sections") or []
+    return RouteResult(
+        tuple(s["polyline"] for s in sections if s.get("polyline")),
+        float(sum((s.get("summary") or {}).get("length", 0) for s in sections)),
+        float(sum((s.get("summary") or {}).get("duration", 0) for s in sections)),
+    )
+
+
+def get_route(
+    origin: LatLon,
+    destination: LatLon,
+    transport_mode: str = "car",
+    precision: int = ROUTE_COORD_PRECISION,
+) -> Optional[RouteResult]:
+    """
+    Route between two points through the cache. Both ends are rounded to
+    `precision` decimals, for the key and for the request, so nearby lookups
+    share an entry. None (not cached) when HERE finds no route.
+    """
+    key = route_key(origin, destination, transport_mode, precision)
+    hit = _routes.get(key)
+    if hit is not None:
+        return hit
+    get_bucket("here").acquire()
+    route = route_from_here(
+        call_routing_here_api(key[0], key[1], transport_mode, return_="polyline,summary")
+    )
+    if route is not None:
+        _routes.set(key, route)
+    return route
+
+
+def customer_travel_matrix(
+    depots: Sequence[Tuple[str, LatLon]],
+    transport_mode: str = "car",
+):
+    """
+    Drive time and distance from every depot to every customer with
+    coordinates, stored or from the geocode cache (geocode_worker.py fills
+    both), computed with the HERE matrix endpoint in a handful of requests.
+    Returns a long pandas DataFrame: DEPOT, EMAIL_ADDRESS, NAME, DURATION_MIN,
+    DISTANCE_KM (NaN where HERE found no route).
+    """
+    import pandas as pd
+
+    rows = get_session().sql(
+        f"""
+        SELECT email_address, name, latitude, longitude
+        FROM ({CUSTOMER_COORDINATES_SQL})
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        """
+    ).collect()
+    columns = ["DEPOT", "EMAIL_ADDRESS", "NAME", "DURATION_MIN", "DISTANCE_KM"]
+    if not rows or not depots:
+        return pd.DataFrame(columns=columns)
+
+    customers: List[LatLon] = [(r["LATITUDE"], r["LONGITUDE"]) for r in rows]
+    times, dists = matrix_routes([p for _, p in depots], customers, transport_mode)
+
+    records = [
+        (depot, r["EMAIL_ADDRESS"], r["NAME"], times[i, j] / 60.0, dists[i, j] / 1000.0)
+        for i, (depot, _) in enumerate(depots)
+        for j, r in enumerate(rows)
+    ]
+    return pd.DataFrame.from_records(records, columns=columns)
+
+
+def route_cache_stats() -> Dict[str, int]:
+    return _routes.stats()
@@ -0,0 +1,98 @@
+# route_simplify.py
+from collections import namedtuple
+
+import numpy as np
+
+MAX_ROUTE_VERTICES = 2_000   # vertex budget for one route sent to pydeck
+PIXEL_TOLERANCE    = 1.0     # allowed deviation, in screen pixels at the view zoom
+
+# deck.gl / Mapbox zoom levels use 512 px tiles: metres per pixel at the equator, zoom 0
+_METRES_PER_PIXEL_Z0 = 78271.517
+_METRES_PER_DEGREE   = 111_320.0
+
+
+class SimplifiedRoute(namedtuple("SimplifiedRoute", "points,original_count,tolerance")):
+    __slots__ = ()
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Share of vertices removed, 0.0 (none) to 1.0."""
+        if not self.original_count:
+            return 0.0
+        return 1.0 - len(self.points) / self.original_count
+
+
+def zoom_tolerance(zoom: float, latitude: float, pixels: float = PIXEL_TOLERANCE) -> float:
+    """Distance in degrees covered by `pixels` screen pixels at `zoom` and `latitude`."""
+    metres_per_pixel = _METRES_PER_PIXEL_Z0 * np.cos(np.radians(latitude)) / 2 ** zoom
+    return pixels * metres_per_pixel / _METRES_PER_DEGREE
+
+
+def douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas–Peucker on (lat, lon[, z]) rows, returning each vertex's importance:
+    the largest tolerance at which it would still be kept (inf for the endpoints,
+    0 for vertices dropped at `tolerance`). `importance > t` is the DP result for
+    any t >= `tolerance`, so one pass serves every coarser tolerance.
+    Distances are planar on an equirectangular projection around the mean latitude.
+    """
+    n = len(points)
+    importance = np.zeros(n)
+    if n == 0:
+        return importance
+    importance[0] = importance[-1] = np.inf
+    if n < 3:
+        return importance
+
+    lat = points[:, 0]
+    xy = np.column_stack((points[:, 1] * np.cos(np.radians(lat.mean())), lat))
+
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        first, last, parent = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = xy[first], xy[last]
+        seg = xy[first + 1:last]
+        ab = b - a
+        norm = np.hypot(ab[0], ab[1])
+        if norm == 0.0:
+            dist = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            dist = np.abs(ab[0] * (seg[:, 1] - a[1]) - ab[1] * (seg[:, 0] - a[0])) / norm
+        i = int(dist.argmax())
+        if dist[i] > tolerance:
+            split = first + 1 + i
+            # a vertex cannot outlive the split that exposed it
+            importance[split] = min(dist[i], parent)
+            stack.append((first, split, importance[split]))
+            stack.append((split, last, importance[split]))
+    return importance
+
+
+def simplify_route(
+    points,
+    zoom: float,
+    max_vertices: int = MAX_ROUTE_VERTICES,
+    pixels: float = PIXEL_TOLERANCE,
+) -> SimplifiedRoute:
+    """
+    Simplify a decoded route for display at `zoom`: drop vertices closer than
+    `pixels` screen pixels to the line, then, if the route is still over
+    `max_vertices`, raise the tolerance to keep only the most important ones.
+    Endpoints are always kept.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) <= 2:
+        return SimplifiedRoute(points, len(points), 0.0)
+
+    tolerance  = zoom_tolerance(zoom, float(points[:, 0].mean()), pixels)
+    importance = douglas_peucker(points, tolerance)
+    keep       = importance > tolerance
+    budget     = max(max_vertices, 2)
+    if keep.sum() > budget:
+        threshold = np.partition(importance, -budget)[-budget]
+        keep      = importance > threshold
+        keep[np.flatnonzero(importance == threshold)[: budget - keep.sum()]] = True
+        tolerance = float(threshold)
+    return SimplifiedRoute(points[keep], len(points), tolerance)
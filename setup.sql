@@ -413,7 +413,7 @@ CREATE OR REPLACE PNP.ETREMBLAY.MODELSACE STAGE models
 CREATE OR REPLACE NETWORK RULE here_api_rules  
 MODE = EGRESS  
 TYPE = HOST_PORT  
-VALUE_LIST = ('router.hereapi.com','geocode.search.hereapi.com');
+VALUE_LIST = ('router.hereapi.com','geocode.search.hereapi.com','batch.geocoder.ls.hereapi.com','matrix.router.hereapi.com');
 
 CREATE OR REPLACE SECRET here_api_key  
 TYPE = GENERIC_STRING  
@@ -1086,7 +1086,7 @@ FROM TABLE(GENERATOR(ROWCOUNT => 100));
 CREATE OR REPLACE NETWORK RULE here_api_rules  
   MODE = EGRESS  
   TYPE = HOST_PORT  
-  VALUE_LIST = ('router.hereapi.com','geocode.search.hereapi.com');
+  VALUE_LIST = ('router.hereapi.com','geocode.search.hereapi.com','batch.geocoder.ls.hereapi.com','matrix.router.hereapi.com');
 
 -- Secret for HERE API key
 -- IMPORTANT: In production, create the secret via a secrets management process; avoid hardcoding secret strings in source-controlled SQL.
@@ -1113,7 +1113,80 @@ ALTER STREAMLIT PNP.ETREMBLAY.V23DZEU56TC6GE2H
   SECRETS = ('here_api_key' = PNP.ETREMBLAY.here_api_key);
 
 -- ---------------------------
--- 6. Notes / cleanup
+-- 6. Geocode cache (persistent tier behind geocode_cache.py)
+-- ---------------------------
+-- One row per normalized address; rows older than GEOCODE_TTL are ignored on read.
+-- NULL lat/lon records that HERE returned no match, so it is not asked again.
+CREATE TABLE IF NOT EXISTS GEOCODE_CACHE_WEBINAR_202508 (
+    address_key VARCHAR PRIMARY KEY,   -- normalize_address(address)
+    address     VARCHAR,               -- address as first seen
+    lat         FLOAT,
+    lon         FLOAT,
+    provider    VARCHAR,               -- e.g. 'HERE'
+    fetched_at  TIMESTAMP_LTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Projected Precisely demographics ({theme: {variable: value}}) behind demographics_cache.py
+CREATE TABLE IF NOT EXISTS DEMOGRAPHICS_CACHE_WEBINAR_202508 (
+    address_key VARCHAR PRIMARY KEY,   -- normalize_address(address)
+    address     VARCHAR,
+    variables   VARIANT,
+    fetched_at  TIMESTAMP_LTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Background extraction of bin requests (bin_request_worker.py)
+-- parsed_fields holds the COMPLETE output; the stream relies on the change tracking enabled above,
+-- and the queue keeps claimed work durable so the worker is safe to restart.
+ALTER TABLE emails_webinar_202508 ADD COLUMN IF NOT EXISTS parsed_fields VARIANT;
+CREATE STREAM IF NOT EXISTS emails_webinar_202508_parse_stream
+  ON TABLE emails_webinar_202508
+  APPEND_ONLY = TRUE
+  SHOW_INITIAL_ROWS = TRUE;
+CREATE TABLE IF NOT EXISTS email_parse_queue_webinar_202508 (
+    message_id  VARCHAR PRIMARY KEY,
+    enqueued_at TIMESTAMP_LTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Triage outcome written by bin_request_retrieval.mark_requests() (NULL = not triaged yet)
+ALTER TABLE emails_webinar_202508 ADD COLUMN IF NOT EXISTS status VARCHAR(16);
+ALTER TABLE emails_webinar_202508 ADD COLUMN IF NOT EXISTS status_updated_at TIMESTAMP_LTZ;
+
+-- Coordinates written back by geocode_cache.batch_geocode_customers() (one HERE batch job + one MERGE)
+ALTER TABLE CUSTOMERS_WEBINAR_202508 ADD COLUMN IF NOT EXISTS LATITUDE FLOAT;
+ALTER TABLE CUSTOMERS_WEBINAR_202508 ADD COLUMN IF NOT EXISTS LONGITUDE FLOAT;
+
+-- Latency spans exported by tracing.flush_spans() (sidebar "Export spans to Snowflake")
+CREATE TABLE IF NOT EXISTS TRACE_SPANS_WEBINAR_202508 (
+    rerun_id    VARCHAR,          -- one Streamlit rerun
+    span_id     NUMBER,
+    parent_id   NUMBER,           -- enclosing span, NULL at the top level
+    name        VARCHAR,          -- e.g. 'here.route', 'sql.fetch_email_page'
+    kind        VARCHAR,          -- sql | agent | complete | here | precisely | cache
+    page        VARCHAR,
+    started_at  TIMESTAMP_LTZ,
+    duration_ms FLOAT,
+    status      VARCHAR,          -- HTTP status, 'ok' or 'error: <exception>'
+    bytes       NUMBER,
+    rows        NUMBER,
+    cache_hit   BOOLEAN,
+    thread      VARCHAR
+);
+
+CREATE OR REPLACE VIEW TRACE_SPAN_LATENCY_WEBINAR_202508 AS
+SELECT DATE_TRUNC('hour', started_at)                          AS hour,
+       kind,
+       name,
+       COUNT(*)                                                AS calls,
+       COUNT_IF(cache_hit)                                     AS cache_hits,
+       COUNT_IF(status NOT IN ('ok', '200'))                   AS failures,
+       PERCENTILE_CONT(0.50) WITHIN GROUP (ORDER BY duration_ms) AS p50_ms,
+       PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY duration_ms) AS p95_ms,
+       PERCENTILE_CONT(0.99) WITHIN GROUP (ORDER BY duration_ms) AS p99_ms
+FROM TRACE_SPANS_WEBINAR_202508
+GROUP BY 1, 2, 3;
+
+-- ---------------------------
+-- 7. Notes / cleanup
 -- ---------------------------
 -- * Removed stray prose, documentation, and external installation instructions from this script.
 -- * If Precisely API integration is required similarly, replicate the pattern above:
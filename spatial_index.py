@@ -0,0 +1,214 @@
+# spatial_index.py
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from clients import get_session
+from geocode_cache import CUSTOMER_COORDINATES_SQL, CUSTOMERS_TABLE
+
+GRID_CELL_DEG      = 0.05   # grid cell size in degrees (~5.5 km of latitude)
+BRUTE_FORCE_BELOW  = 256    # below this many points a full scan beats the grid
+REFRESH_INTERVAL   = 60     # seconds between incremental refreshes from Snowflake
+NEARBY_K           = 10
+NEARBY_RADIUS_KM   = 25.0
+
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEGREE  = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+class Neighbour(NamedTuple):
+    key: Any
+    lat: float
+    lon: float
+    distance_km: float
+    data: Any
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to arrays of points."""
+    p1, p2 = math.radians(lat), np.radians(lats)
+    dphi   = p2 - p1
+    dlmb   = np.radians(lons) - math.radians(lon)
+    a = np.sin(dphi / 2) ** 2 + math.cos(p1) * np.cos(p2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """
+    Points bucketed into a regular lat/lon grid, with k-nearest and radius
+    queries over haversine distance. Points can be added, moved and removed
+    one at a time, so the index is kept up to date without rebuilding it.
+    Thread-safe. Longitudes are not wrapped at the antimeridian.
+    """
+
+    def __init__(self, cell_deg: float = GRID_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._points: Dict[Any, Tuple[float, float, Any]] = {}
+        self._cells: Dict[Tuple[int, int], Set[Any]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def upsert(self, key: Any, lat: float, lon: float, data: Any = None) -> None:
+        with self._lock:
+            self._discard(key)
+            self._points[key] = (float(lat), float(lon), data)
+            self._cells.setdefault(self._cell(lat, lon), set()).add(key)
+
+    def remove(self, key: Any) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key: Any) -> None:
+        old = self._points.pop(key, None)
+        if old is not None:
+            cell = self._cell(old[0], old[1])
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._cells[cell]
+
+    def keys(self) -> Set[Any]:
+        with self._lock:
+            return set(self._points)
+
+    def _rank(self, lat: float, lon: float, keys: Iterable[Any]) -> List[Neighbour]:
+        keys = list(keys)
+        if not keys:
+            return []
+        pts  = [self._points[k] for k in keys]
+        dist = haversine_km(lat, lon, np.fromiter((p[0] for p in pts), float, len(pts)),
+                            np.fromiter((p[1] for p in pts), float, len(pts)))
+        order = np.argsort(dist, kind="stable")
+        return [Neighbour(keys[i], pts[i][0], pts[i][1], float(dist[i]), pts[i][2]) for i in order]
+
+    def _ring(self, ci: int, cj: int, r: int) -> Iterable[Any]:
+        """Keys of the cells at Chebyshev distance exactly `r` from (ci, cj)."""
+        for i in range(ci - r, ci + r + 1):
+            edge = i in (ci - r, ci + r)
+            for j in (range(cj - r, cj + r + 1) if edge else (cj - r, cj + r)):
+                members = self._cells.get((i, j))
+                if members:
+                    yield from members
+
+    def nearest(self, lat: float, lon: float, k: int = NEARBY_K) -> List[Neighbour]:
+        """The `k` closest points, nearest first."""
+        with self._lock:
+            if k <= 0 or not self._points:
+                return []
+            if len(self._points) < BRUTE_FORCE_BELOW:
+                return self._rank(lat, lon, self._points)[:k]
+
+            ci, cj = self._cell(lat, lon)
+            found: List[Neighbour] = []
+            r = 0
+            while True:
+                found += self._rank(lat, lon, self._ring(ci, cj, r))
+                if len(found) >= len(self._points):
+                    break
+                if len(found) >= k:
+                    found.sort(key=lambda n: n.distance_km)
+                    # anything in ring r+1 is at least r cells away along one axis
+                    far_lat = min(89.9, abs(lat) + (r + 1) * self.cell_deg)
+                    bound = r * self.cell_deg * _KM_PER_DEGREE * math.cos(math.radians(far_lat))
+                    if found[k - 1].distance_km <= bound:
+                        break
+                r += 1
+            found.sort(key=lambda n: n.distance_km)
+            return found[:k]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Neighbour]:
+        """Every point within `radius_km`, nearest first."""
+        with self._lock:
+            if not self._points:
+                return []
+            if len(self._points) < BRUTE_FORCE_BELOW:
+                hits = self._rank(lat, lon, self._points)
+            else:
+                dlat = radius_km / _KM_PER_DEGREE
+                dlon = radius_km / (_KM_PER_DEGREE * max(math.cos(math.radians(min(89.9, abs(lat) + dlat))), 1e-6))
+                i0, j0 = self._cell(lat - dlat, lon - dlon)
+                i1, j1 = self._cell(lat + dlat, lon + dlon)
+                hits = self._rank(lat, lon, (
+                    key
+                    for i in range(i0, i1 + 1)
+                    for j in range(j0, j1 + 1)
+                    for key in self._cells.get((i, j), ())
+                ))
+            return [n for n in hits if n.distance_km <= radius_km]
+
+
+class CustomerIndex(GridIndex):
+    """
+    GridIndex of the customers with coordinates (stored, or from the geocode
+    cache), keyed by EMAIL_ADDRESS. refresh() reads only the rows updated since
+    the last one (plus the list of e-mail addresses, to drop deleted customers).
+    """
+
+    def __init__(self, cell_deg: float = GRID_CELL_DEG):
+        super().__init__(cell_deg)
+        self.watermark: Optional[str] = None   # MAX(updated_at) seen, as text
+        self.refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self) -> int:
+        """Apply changes since the last refresh; returns the number of rows read."""
+        with self._refresh_lock:
+            where, params = "", []
+            if self.watermark is not None:
+                where, params = "WHERE updated_at > TO_TIMESTAMP_NTZ(?)", [self.watermark]
+            rows = get_session().sql(
+                f"""
+                SELECT email_address, name, full_address, latitude, longitude,
+                       TO_VARCHAR(updated_at, 'YYYY-MM-DD HH24:MI:SS.FF9') AS updated_key
+                FROM ({CUSTOMER_COORDINATES_SQL})
+                {where}
+                """,
+                params=params,
+            ).collect()
+            for r in rows:
+                if r["LATITUDE"] is None or r["LONGITUDE"] is None:
+                    self.remove(r["EMAIL_ADDRESS"])
+                else:
+                    self.upsert(r["EMAIL_ADDRESS"], r["LATITUDE"], r["LONGITUDE"],
+                                {"name": r["NAME"], "address": r["FULL_ADDRESS"]})
+                if r["UPDATED_KEY"] and (self.watermark is None or r["UPDATED_KEY"] > self.watermark):
+                    self.watermark = r["UPDATED_KEY"]
+
+            if self.watermark is not None and len(self):
+                live = {r["EMAIL_ADDRESS"] for r in
+                        get_session().sql(f"SELECT email_address FROM {CUSTOMERS_TABLE}").collect()}
+                for key in self.keys() - live:
+                    self.remove(key)
+            self.refreshed_at = time.monotonic()
+            return len(rows)
+
+
+_customer_index = CustomerIndex()
+
+
+def get_customer_index(max_age: float = REFRESH_INTERVAL) -> CustomerIndex:
+    """The shared customer index, refreshed incrementally when older than `max_age` seconds."""
+    if time.monotonic() - _customer_index.refreshed_at > max_age:
+        _customer_index.refresh()
+    return _customer_index
+
+
+def nearby_customers(
+    lat: float,
+    lon: float,
+    k: int = NEARBY_K,
+    radius_km: float = NEARBY_RADIUS_KM,
+) -> List[Neighbour]:
+    """Up to `k` customers within `radius_km` of (lat, lon), nearest first."""
+    # a radius query only visits the cells it covers; nearest() would walk
+    # outwards until it found k points, however far away
+    return get_customer_index().within(lat, lon, radius_km)[:k]
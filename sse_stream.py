@@ -0,0 +1,156 @@
+# sse_stream.py
+import codecs
+import json
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+_decoder = json.JSONDecoder()
+
+
+def _iter_json_array(content: str) -> Iterator[Dict]:
+    """Decode a JSON array of events one element at a time."""
+    pos, end = 0, len(content)
+    while pos < end and content[pos].isspace():
+        pos += 1
+    if pos == end or content[pos] != "[":
+        raise json.JSONDecodeError("Expected a JSON array of events", content, pos)
+    pos += 1
+    while True:
+        while pos < end and (content[pos].isspace() or content[pos] == ","):
+            pos += 1
+        if pos < end and content[pos] == "]":
+            return
+        evt, pos = _decoder.raw_decode(content, pos)
+        yield evt
+
+
+def _iter_wire_events(chunks: Iterable[Union[str, bytes]]) -> Iterator[Dict]:
+    """Decode text/event-stream chunks (`event:` / `data:` lines, blank line ends an event)."""
+    buffer, name, data = "", None, []
+    utf8 = codecs.getincrementaldecoder("utf-8")()  # a character may be split across byte chunks
+    for chunk in chunks:
+        buffer += utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line = line.rstrip("\r")
+            if not line:
+                if data:
+                    payload = "\n".join(data)
+                    yield {"event": name, "data": json.loads(payload) if payload != "[DONE]" else None}
+                name, data = None, []
+            elif line.startswith("event:"):
+                name = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].lstrip())
+    utf8.decode(b"", final=True)  # raises on a multi-byte sequence cut off at the end
+    if data:
+        payload = "\n".join(data)
+        yield {"event": name, "data": json.loads(payload) if payload != "[DONE]" else None}
+
+
+def iter_sse_events(source) -> Iterator[Dict]:
+    """
+    Yield agent events as they become available from any of:
+      - a list of already-parsed events
+      - the buffered `content` string of send_snow_api_request (a JSON array)
+      - an iterable of raw text/event-stream chunks, e.g. a streaming HTTP body
+    """
+    if isinstance(source, (str, bytes)):
+        text = source.decode("utf-8") if isinstance(source, bytes) else source
+        if text.lstrip().startswith("["):
+            yield from _iter_json_array(text)
+        else:
+            yield from _iter_wire_events([text])
+    elif isinstance(source, list) and (not source or isinstance(source[0], dict)):
+        yield from source
+    else:
+        yield from _iter_wire_events(source)
+
+
+class AgentStream:
+    """
+    Incremental view of one agent response. text_deltas() yields answer text as
+    events are decoded (suitable for st.write_stream) while SQL and citations
+    are collected on the side. Timings are measured from construction, so
+    create it right before issuing the request.
+    """
+
+    def __init__(self, source=None):
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.sql = ""
+        self.citations: List[Dict] = []
+        self._parts: List[str] = []
+        self._source = source
+
+    def feed(self, source) -> "AgentStream":
+        """Attach the response (once the request has returned or started streaming)."""
+        self._source = source
+        return self
+
+    def text_deltas(self) -> Iterator[str]:
+        for evt in iter_sse_events(self._source or []):
+            if evt.get("event") != "message.delta":
+                continue
+            for c in evt["data"]["delta"].get("content", []):
+                if c["type"] == "text":
+                    yield self._emit(c["text"])
+                elif c["type"] == "tool_results":
+                    for r in c["tool_results"]["content"]:
+                        if r["type"] == "json":
+                            j = r["json"]
+                            if j.get("text"):
+                                yield self._emit(j["text"])
+                            self.sql = j.get("sql", self.sql)
+                            for sr in j.get("searchResults", []):
+                                self.citations.append({
+                                    "source_id": sr.get("source_id",""),
+                                    "doc_id":    sr.get("doc_id","")
+                                })
+        self.finished_at = time.perf_counter()
+
+    def _emit(self, delta: str) -> str:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self._parts.append(delta)
+        return delta
+
+    def scan_sql(self) -> str:
+        """
+        SQL of the response, read without decoding its text or starting the
+        timings, so the answer can still be streamed afterwards. Needs a
+        re-iterable source (buffered content or a list of events).
+        """
+        sql = ""
+        for evt in iter_sse_events(self._source or []):
+            if evt.get("event") != "message.delta":
+                continue
+            for c in evt["data"]["delta"].get("content", []):
+                if c["type"] == "tool_results":
+                    for r in c["tool_results"]["content"]:
+                        if r["type"] == "json":
+                            sql = r["json"].get("sql", sql)
+        return sql.strip()
+
+    def consume(self) -> "AgentStream":
+        """Drain the stream without rendering it."""
+        for _ in self.text_deltas():
+            pass
+        return self
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts).strip()
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def total_time(self) -> Optional[float]:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
@@ -1,21 +1,43 @@
 import streamlit as st
 import json
 import re
+import threading
+import time
 import pandas as pd
+from typing import Optional
 import _snowflake
-import streamlit_folium
-
-from snowflake.snowpark.context import get_active_session
-from bin_request_retrieval import fetch_bin_request, fetch_bin_requests, mark_request_read
-from call_here_api import (
-    call_routing_here_api,
-    call_geocoding_here_api,
-    decode_polyline,
-    display_map,
-)
-from call_precisely_api import call_precisely_demographics
 
-session = get_active_session()
+from clients import get_session
+from bin_request_retrieval import (
+    EMAIL_PAGE_SIZE,
+    approx_email_count,
+    fetch_bin_request,
+    fetch_bin_requests,
+    fetch_email,
+    fetch_email_page,
+    mark_requests,
+    reextract_bin_request,
+)
+from call_here_api import display_map, display_points_map
+from demographics_cache import prewarm_demographics_cache
+from enrichment import CALL_TIMEOUTS, enrich_addresses
+from spatial_index import NEARBY_RADIUS_KM, get_customer_index, nearby_customers
+from route_cache import customer_travel_matrix
+from http_client import connection_stats
+from sse_stream import AgentStream
+from transcripts import fetch_transcripts
+from generated_sql import GENERATED_SQL_MAX_ROWS, GENERATED_SQL_ROW_CAP, run_generated_sql
+from response_cache import (
+    CachedAnswer,
+    get_answer,
+    invalidate_responses,
+    response_cache_stats,
+    store_answer,
+)
+import dispatch
+import tracing
+from address_extraction import extract_addresses_cached, extraction_stats
+from geocode_cache import cache_stats, geocode_cached, iter_geocode_many_cached
 
 API_ENDPOINT = "/api/v2/cortex/agent:run"
 API_TIMEOUT  = 50_000  # milliseconds
@@ -27,35 +49,25 @@ CORTEX_MODEL           = "claude-4-sonnet"
 
 def process_sse_response(events):
     """Parse SSE events into (text, sql, citations)."""
-    text, sql, citations = "", "", []
-    for evt in events:
-        if evt.get("event") == "message.delta":
-            for c in evt["data"]["delta"].get("content", []):
-                if c["type"] == "text":
-                    text += c["text"]
-                elif c["type"] == "tool_results":
-                    for r in c["tool_results"]["content"]:
-                        if r["type"] == "json":
-                            j = r["json"]
-                            text += j.get("text", "")
-                            sql = j.get("sql", sql)
-                            for sr in j.get("searchResults", []):
-                                citations.append({
-                                    "source_id": sr.get("source_id",""),
-                                    "doc_id":    sr.get("doc_id","")
-                                })
-    return text.strip(), sql.strip(), citations
+    stream = AgentStream(events).consume()
+    return stream.text, stream.sql.strip(), stream.citations
 
 
 def run_snowflake_query(sql):
     try:
-        return session.sql(sql.replace(";", ""))
+        return get_session().sql(sql.replace(";", ""))
     except Exception as e:
         st.error(f"SQL error: {e}")
         return None
 
 
 def extract_addresses(text: str) -> list[str]:
+    """Street addresses in `text`; memoized and pre-filtered by address_extraction."""
+    return extract_addresses_cached(text, _extract_addresses_llm)
+
+
+def _extract_addresses_llm(text: str) -> Optional[list[str]]:
+    """Ask the model for the addresses in `text`; None when the call itself failed."""
     prompt = (
         "Extract every full street address from this text and output only "
         "a JSON array of strings (no markdown). Example:\n"
@@ -68,82 +80,122 @@ def extract_addresses(text: str) -> list[str]:
             {"role":"user","content":[{"type":"text","text":prompt}]}
         ],
     }
-    resp = _snowflake.send_snow_api_request(
-        "POST", API_ENDPOINT, {}, {}, payload, None, API_TIMEOUT
-    )
+    with tracing.span("cortex.extract_addresses", kind="agent") as sp:
+        resp = _snowflake.send_snow_api_request(
+            "POST", API_ENDPOINT, {}, {}, payload, None, API_TIMEOUT
+        )
+        sp.set(status=resp.get("status"), bytes=len(resp.get("content") or ""))
     if resp.get("status") != 200:
         st.error(f"Agent error: {resp.get('status')}")
-        return []
+        return None
     try:
         events = json.loads(resp.get("content","[]"))
     except json.JSONDecodeError:
-        return []
+        return None
     full_text, _, _ = process_sse_response(events)
     cleaned = re.sub(r"```(?:json)?","", full_text, flags=re.IGNORECASE).strip()
     m = re.search(r"\[.*\]", cleaned, flags=re.DOTALL)
     if not m:
         return []
     try:
-        return json.loads(m.group(0))
+        found = json.loads(m.group(0))
     except json.JSONDecodeError:
-        return []
+        return None
+    return [a for a in found if isinstance(a, str)] if isinstance(found, list) else []
 
 
 def geocode_address(addr: str):
     try:
-        geo = call_geocoding_here_api(addr)
-        items = geo.get("items") or []
-        if not items:
-            return None, None
-        pos = items[0]["position"]
-        return pos["lat"], pos["lng"]
+        return geocode_cached(addr)
     except Exception as e:
         st.error(f"Geocoding failed: {e}")
         return None, None
 
 
-def handle_address_logic(query: str, assistant_text: str) -> bool:
+def resolve_addresses(query: str, addrs: list[str]) -> list[str]:
+    """Extracted addresses, falling back on "between ... and ..." in the query."""
+    if not addrs:
+        m = re.search(r"between\s+(.*?)\s+and\s+(.*)", query, flags=re.IGNORECASE)
+        if m:
+            addrs = [m.group(1).strip(" ,."), m.group(2).strip(" ,.")]
+    return addrs
+
+
+def handle_address_logic(
+    query: str,
+    assistant_text: str,
+    addrs: Optional[list[str]] = None,
+    demographics_for: Optional[str] = None,
+) -> bool:
     """
-    1) Ask Cortex to extract addresses from the **user’s query**.
+    1) Ask Cortex to extract addresses from the **user’s query** (unless `addrs` is given).
     2) Fallback on "between ... and ...".
     3) If 1 address → geocode + st.map
     4) If 2 addresses → geocode + routing + display_map
+    Geocodes and the demographics of `demographics_for` run concurrently
+    (enrichment.py); each result is rendered as soon as it arrives, so the map
+    never waits on demographics.
     Returns True if we handled it here (and should skip the agent).
     """
-    addrs = extract_addresses(query)
-    if not addrs:
-        m = re.search(r"between\s+(.*?)\s+and\s+(.*)", query, flags=re.IGNORECASE)
-        if m:
-            addrs = [m.group(1).strip(" ,."), m.group(2).strip(" ,.")]
+    if addrs is None:
+        addrs = extract_addresses(query)
+    addrs = resolve_addresses(query, addrs)
     st.write("🔍 extracted addresses:", addrs)
+    if len(addrs) not in (1, 2):
+        # nothing to do
+        return False
 
-    # Single-point map
+    map_slot  = st.container()
+    demo_slot = st.container()
+    timings   = []
     if len(addrs) == 1:
-        lat, lon = geocode_address(addrs[0])
-        if lat is not None:
-            st.write(f"📍 Map for: **{addrs[0]}**")
-            st.map(pd.DataFrame({"lat":[lat],"lon":[lon]}))
-        return True
-
-    # Route between two points
-    if len(addrs) == 2:
-        lat1, lon1 = geocode_address(addrs[0])
-        lat2, lon2 = geocode_address(addrs[1])
-        if None in (lat1, lon1, lat2, lon2):
-            st.error("Could not geocode one or both addresses.")
-            return True
-        here_json = call_routing_here_api((lat1, lon1), (lat2, lon2))
-        coords    = decode_polyline(here_json)
-        display_map(coords)
-        return True
-
-    # nothing to do
-    return False
-
-
-def snowflake_api_call(prompt: str, limit: int = 5):
-    """Call Cortex with only the two supported tools."""
-    payload = {
+        # bring the customer index up to date while the address is geocoded
+        index_fut = dispatch.submit(get_customer_index)
+    for evt in enrich_addresses(addrs, demographics_for):
+        timings.append(f"{evt.kind} {evt.seconds:.2f}s")
+        if evt.kind == "geocode":
+            if evt.error:
+                map_slot.error(f"Geocoding failed for {addrs[evt.key]}: {evt.error}")
+            elif len(addrs) == 1 and evt.value[0] is not None:
+                # Single-point map, with the existing customers around it
+                lat, lon = evt.value
+                try:
+                    index_fut.result(timeout=CALL_TIMEOUTS["geocode"])
+                    nearby = nearby_customers(lat, lon)
+                except Exception as e:
+                    map_slot.warning(f"Nearby customers unavailable: {e}")
+                    nearby = []
+                with map_slot:
+                    st.write(f"📍 Map for: **{addrs[0]}**")
+                    display_points_map((lat, lon), nearby)
+                    if nearby:
+                        st.caption(f"{len(nearby)} existing customers within {NEARBY_RADIUS_KM:g} km")
+                        st.dataframe(pd.DataFrame([
+                            {"Customer": (n.data or {}).get("name"), "Address": (n.data or {}).get("address"),
+                             "Distance (km)": round(n.distance_km, 2)}
+                            for n in nearby
+                        ]), use_container_width=True)
+        elif evt.kind == "route":
+            # Route between two points
+            with map_slot:
+                if evt.error:
+                    st.error(f"Routing failed: {evt.error}")
+                else:
+                    display_map(evt.value)
+        elif evt.kind == "demographics":
+            with demo_slot:
+                if evt.error:
+                    st.error(f"Demographics lookup failed: {evt.error}")
+                else:
+                    st.write(f"### Demographics for {evt.key}")
+                    st.json(evt.value)
+    st.caption("⏱️ " + " · ".join(timings))
+    return True
+
+
+def agent_payload(prompt: str, limit: int = 5) -> dict:
+    """Agent request with only the two supported tools."""
+    return {
         "model": CORTEX_MODEL,
         "messages":[{"role":"user","content":[{"type":"text","text":prompt}]}],
         "tool_choice": {"type":"auto"},
@@ -160,51 +212,129 @@ def snowflake_api_call(prompt: str, limit: int = 5):
             }
         }
     }
-    resp = _snowflake.send_snow_api_request(
-        "POST", API_ENDPOINT, {}, {}, payload, None, API_TIMEOUT
-    )
-    if resp.get("status") != 200:
-        st.error(f"Agent HTTP error: {resp.get('status')}")
-        st.write("🔍 Raw agent response:", resp)
-        return []
-    try:
-        return json.loads(resp["content"])
-    except json.JSONDecodeError as e:
-        st.error(f"Failed to parse response JSON: {e}")
-        return []
 
 
-def direct_completion(prompt: str) -> str:
-    """Fallback pure-text completion (no tools)."""
-    payload = {
+def completion_payload(prompt: str) -> dict:
+    """Plain completion request (no tools)."""
+    return {
         "model": CORTEX_MODEL,
         "messages":[{"role":"user","content":[{"type":"text","text":prompt}]}]
     }
-    resp = _snowflake.send_snow_api_request(
-        "POST", API_ENDPOINT, {}, {}, payload, None, API_TIMEOUT
-    )
+
+
+def request_agent_stream(payload: dict):
+    """
+    POST `payload` to the agent endpoint without touching the UI, so it can run
+    on a worker thread. Returns (AgentStream, None), or (None, raw response) on HTTP error.
+    """
+    stream = AgentStream()
+    name = "cortex.agent" if payload.get("tools") else "cortex.completion"
+    with tracing.span(name, kind="agent") as sp:
+        resp = _snowflake.send_snow_api_request(
+            "POST", API_ENDPOINT, {}, {}, payload, None, API_TIMEOUT
+        )
+        sp.set(status=resp.get("status"), bytes=len(resp.get("content") or ""))
     if resp.get("status") != 200:
-        st.error(f"Completion HTTP error: {resp.get('status')}")
-        return ""
-    try:
-        events = json.loads(resp["content"])
-    except json.JSONDecodeError:
-        return ""
-    text = ""
-    for evt in events:
-        if evt.get("event") == "message.delta":
-            for c in evt["data"]["delta"].get("content", []):
-                if c["type"] == "text":
-                    text += c["text"]
-    return text.strip()
+        return None, resp
+    return stream.feed(resp.get("content", "[]")), None
+
 
+def render_answer(slot, stream) -> str:
+    """Write an AgentStream's text into `slot` as it is decoded; returns the full text."""
+    def deltas():
+        prefix = "**Assistant:** "
+        try:
+            for delta in stream.text_deltas():
+                yield prefix + delta
+                prefix = ""
+        except json.JSONDecodeError as e:
+            st.error(f"Failed to parse response JSON: {e}")
+
+    slot.write_stream(deltas())
+    return stream.text
+
+
+def agent_job(prompt: str, discarded: threading.Event, bypass_cache: bool = False) -> dict:
+    """
+    Worker side of the Prospecting dispatch (no st calls): a cached answer, or
+    the two-tool agent's not yet decoded AgentStream, which the UI renders as
+    it is decoded. The events are only scanned for SQL here; when there is
+    none, the direct completion fallback is submitted right away, before the
+    UI has rendered anything, unless the dispatcher has meanwhile discarded
+    this branch.
+    """
+    t0 = time.perf_counter()
+    payload = agent_payload(prompt)
+    answer  = None if bypass_cache else get_answer(payload)
+    stream, failed, error = None, None, None
+    sql = answer.sql if answer is not None else ""
+    if answer is None:
+        stream, failed = request_agent_stream(payload)
+        if stream is not None:
+            try:
+                sql = stream.scan_sql()
+            except json.JSONDecodeError as e:
+                stream, error = None, f"Failed to parse response JSON: {e}"
+    fallback = None
+    if not sql and not discarded.is_set():
+        fallback = dispatch.submit(dispatch.timed, completion_job, prompt, bypass_cache)
+    return {
+        "payload":  payload,
+        "answer":   answer,
+        "cached":   answer is not None,
+        "stream":   stream,
+        "failed":   failed,
+        "error":    error,
+        "fallback": fallback,
+        "seconds":  time.perf_counter() - t0,
+    }
+
+
+def completion_job(prompt: str, bypass_cache: bool = False) -> dict:
+    """
+    Worker side of the completion fallback (no st calls): a cached answer, or
+    the not yet decoded AgentStream so the UI can render it as it is decoded.
+    """
+    payload = completion_payload(prompt)
+    answer  = None if bypass_cache else get_answer(payload)
+    if answer is not None:
+        return {"payload": payload, "answer": answer, "stream": None, "failed": None}
+    stream, failed = request_agent_stream(payload)
+    return {"payload": payload, "answer": None, "stream": stream, "failed": failed}
+
+
+def record_branch_latency(branch: str, seconds: float) -> None:
+    st.session_state.setdefault("branch_latencies", []).append(
+        {"branch": branch, "seconds": round(seconds, 3)}
+    )
+
+
+def render_trace(trace: tracing.Trace) -> None:
+    """Per-kind rollup and a waterfall of one rerun's spans, in the current container."""
+    import altair as alt
+
+    st.dataframe(pd.DataFrame.from_dict(trace.rollup(), orient="index").round(1))
+    spans = pd.DataFrame(trace.waterfall())
+    chart = alt.Chart(spans).mark_bar().encode(
+        x=alt.X("start_ms:Q", title="ms since rerun start"),
+        x2="end_ms:Q",
+        y=alt.Y("span:N", sort=None, title=None),
+        color="kind:N",
+        tooltip=["name", "kind", "duration_ms", "status", "bytes", "rows", "cache_hit", "thread"],
+    )
+    st.altair_chart(chart, use_container_width=True)
 
 
 def main():
     st.title("🚚 Bin Management & Mapping Assistant")
 
     # Sidebar navigation
-    page = st.sidebar.radio("Select view:", ["Customers list", "New requests", "Prospecting"])
+    page = st.sidebar.radio("Select view:", ["Customers list", "New requests", "Prospecting"], key="page")
+
+    # a run cut short by st.rerun() leaves its trace installed; drop it
+    tracing.finish_rerun()
+    if st.session_state.get("trace_enabled"):
+        tracing.start_rerun(page, export=st.session_state.get("trace_export", False))
 
     # ── Prospecting view
     if page == "Customers list":
@@ -214,19 +344,74 @@ def main():
         query = "SELECT * FROM CUSTOMERS_WEBINAR_202508"
         df = run_snowflake_query(query)
         if df is not None:
-            pdf = df.to_pandas()
+            with tracing.span("sql.customers", kind="sql") as sp:
+                pdf = df.to_pandas()
+                sp.set(rows=len(pdf))
 
             # ── Map of customer addresses ───────────────────────────────────────
             # assumes your table has a FULL_ADDRESS column
+            # one bulk cache lookup, then parallel HERE calls for the misses;
+            # the map is redrawn as results stream in
+            # rows already geocoded by the batch job need no lookup at all
             coords = []
-            for addr in pdf["FULL_ADDRESS"].dropna().unique():
-                lat, lon = geocode_address(addr)
-                if lat is not None and lon is not None:
-                    coords.append({"lat": lat, "lon": lon})
+            todo   = pdf
+            if {"LATITUDE", "LONGITUDE"} <= set(pdf.columns):
+                located = pdf["LATITUDE"].notna() & pdf["LONGITUDE"].notna()
+                coords  = [
+                    {"lat": lat, "lon": lon}
+                    for lat, lon in pdf.loc[located, ["LATITUDE", "LONGITUDE"]].itertuples(index=False)
+                ]
+                todo = pdf[~located]
+            addresses = todo["FULL_ADDRESS"].dropna().unique()
+            map_slot  = st.empty()
+            progress  = st.progress(0.0, text="Geocoding customer addresses…")
+            done      = 0
+            try:
+                for _, (lat, lon) in iter_geocode_many_cached(addresses):
+                    done += 1
+                    if lat is not None and lon is not None:
+                        coords.append({"lat": lat, "lon": lon})
+                    if coords and done % 25 == 0:
+                        map_slot.map(pd.DataFrame(coords))
+                    progress.progress(done / len(addresses))
+            except Exception as e:
+                st.error(f"Geocoding failed: {e}")
+            progress.empty()
             if coords:
-                st.map(pd.DataFrame(coords))
+                map_slot.map(pd.DataFrame(coords))
             else:
-                st.info("No valid addresses to map")
+                map_slot.info("No valid addresses to map")
+            stats = cache_stats()
+            st.caption(
+                f"Geocode cache: {stats['memory_hits']} memory hits, "
+                f"{stats['table_hits']} table hits, {stats['http_calls']} HERE calls"
+            )
+
+            if st.button("🔥 Prewarm demographics cache"):
+                with st.spinner("Fetching demographics for every customer address…"):
+                    n = prewarm_demographics_cache()
+                st.success(f"Demographics cached for {n} new addresses.")
+
+            # ── Drive times from depots to every geocoded customer (HERE matrix routing)
+            with st.expander("🚚 Drive times from depots"):
+                depot_text = st.text_area("Depot addresses (one per line)", key="depot_addresses")
+                if st.button("Compute drive times", key="depot_matrix") and depot_text.strip():
+                    depots = []
+                    for addr in (a.strip() for a in depot_text.splitlines()):
+                        if not addr:
+                            continue
+                        lat, lon = geocode_address(addr)
+                        if lat is None:
+                            st.warning(f"Could not geocode depot: {addr}")
+                        else:
+                            depots.append((addr, (lat, lon)))
+                    if depots:
+                        try:
+                            with st.spinner("Computing the depot × customer matrix…"):
+                                travel = customer_travel_matrix(depots)
+                            st.dataframe(travel, use_container_width=True)
+                        except Exception as e:
+                            st.error(f"Matrix routing failed: {e}")
 
             # ── Scrollable customer table ──────────────────────────────────────
             
@@ -239,115 +424,147 @@ def main():
 # ── New requests view
     elif page == "New requests":
       
-        # fetch raw emails (with message_id, body, comment, etc.)
-        df_emails = run_snowflake_query("SELECT * FROM emails_webinar_202508")
-        if df_emails is None:
-            st.error("Failed to fetch emails_webinar_202508.")
+        # keyset pagination: email_cursors[i] is the cursor that starts page i
+        if "email_cursors" not in st.session_state:
+            st.session_state.email_cursors = [None]
+        if "selected_email_id" not in st.session_state:
+            st.session_state.selected_email_id = None
+
+        page_size = EMAIL_PAGE_SIZE
+        cursors   = st.session_state.email_cursors
+        page_no   = len(cursors) - 1
+
+        # the page and the approximate total are kept across reruns; they are
+        # re-read only when navigating or after triage
+        cached = st.session_state.get("email_page")
+        if cached is None or cached["cursor"] != cursors[-1]:
+            try:
+                rows, next_cursor = fetch_email_page(cursors[-1], page_size)
+                cached = {"cursor": cursors[-1], "rows": rows, "next": next_cursor,
+                          "total": approx_email_count()}
+                st.session_state.email_page = cached
+            except Exception as e:
+                st.error(f"Failed to fetch emails_webinar_202508: {e}")
+                cached = None
+
+        if cached is None:
+            pass
+        elif not cached["rows"] and page_no == 0:
+            st.info("No emails found in emails_webinar_202508.")
         else:
-            email_pdf = df_emails.to_pandas()
-            email_pdf.columns = email_pdf.columns.str.lower()
-            email_pdf = email_pdf.reset_index(drop=True)
-
-            if email_pdf.empty:
-                st.info("No emails found in emails_webinar_202508.")
+            rows        = cached["rows"]
+            next_cursor = cached["next"]
+            start       = page_no * page_size
+
+            # columns to list
+            list_fields = ("subject", "received_at", "status")
+
+            # header
+            col_widths = [1] + [4]*len(list_fields) + [1]
+            hdr = st.columns(col_widths)
+            hdr[0].markdown("**#**")
+            for i, fld in enumerate(list_fields):
+                hdr[i+1].markdown(f"**{fld.replace('_',' ').title()}**")
+            hdr[-1].markdown("**🔍**")
+
+            # render rows; the checkbox picks a row for bulk Approve / Reject
+            for i, row in enumerate(rows):
+                cols = st.columns(col_widths)
+                cols[0].checkbox(str(start + i + 1), key=f"pick_{row['message_id']}")
+                for j, fld in enumerate(list_fields):
+                    cols[j+1].write(row.get(fld) or "")
+                if cols[-1].button("🔍", key=f"view_{row['message_id']}"):
+                    st.session_state.selected_email_id = row["message_id"]
+
+            # pagination controls
+            def _prev_page():
+                st.session_state.email_cursors.pop()
+
+            def _next_page():
+                st.session_state.email_cursors.append(next_cursor)
+
+            nav1, nav2, nav3 = st.columns([1,2,1])
+            nav1.button("◀️ Prev", disabled=page_no == 0, on_click=_prev_page)
+            total = cached["total"]
+            if total:
+                n_pages = max((total - 1) // page_size + 1, page_no + 1)
+                nav2.markdown(f"Page **{page_no+1}** of **~{n_pages}**")
             else:
-                # pagination
-                if "email_page" not in st.session_state:
-                    st.session_state.email_page = 0
-                page_size = 5
-                total     = len(email_pdf)
-                n_pages   = (total - 1) // page_size + 1
-                page      = st.session_state.email_page
-                start     = page * page_size
-                end       = min(start + page_size, total)
-
-                # columns to list
-                list_fields = [f for f in ("subject","received_at") if f in email_pdf.columns]
-                page_df = (
-                    email_pdf
-                    .iloc[start:end]
-                    .reset_index()
-                    .rename(columns={"index":"orig_idx"})
+                nav2.markdown(f"Page **{page_no+1}**")
+            nav3.button("Next ▶️", disabled=next_cursor is None, on_click=_next_page)
+
+            # show details & editable fields; the body is read for this message only
+            sel_id = st.session_state.selected_email_id
+            sel    = st.session_state.get("selected_email") or {}
+            if sel_id is not None and sel.get("message_id") != sel_id:
+                sel = fetch_email(sel_id)
+                st.session_state.selected_email = sel
+            if sel_id is not None and sel:
+                st.markdown("---")
+                st.subheader(f"Details for Email: {sel.get('subject') or sel_id}")
+                st.markdown(f"**Body:**  \n{sel.get('body','*(no body found)*')}")
+                st.markdown(f"**Comment:**  \n{sel.get('comment','*(no comment found)*')}")
+
+                # fetch parsed fields just for this message_id (memoized across reruns)
+                if st.button("🔁 Re-extract", key=f"reextract_{sel_id}"):
+                    with st.spinner("Re-running extraction…"):
+                        entry = reextract_bin_request(sel_id)
+                    # drop edited values so the inputs show the fresh extraction
+                    for prefix in ("fmt", "qty", "date", "user"):
+                        st.session_state.pop(f"{prefix}_email_{sel_id}", None)
+                else:
+                    entry = fetch_bin_request(sel_id, sel.get("body"))
+
+                # editable inputs with initial values
+                st.text_input(
+                    "Container Format",
+                    value=entry.get("container_format", ""),
+                    key=f"fmt_email_{sel_id}"
+                )
+                st.text_input(
+                    "Quantity",
+                    value=entry.get("quantity", ""),
+                    key=f"qty_email_{sel_id}"
+                )
+                st.text_input(
+                    "Date Needed",
+                    value=entry.get("date_needed", ""),
+                    key=f"date_email_{sel_id}"
+                )
+                st.text_input(
+                    "Requester",
+                    value=entry.get("requester", ""),
+                    key=f"user_email_{sel_id}"
+                )
+                # ── auto‑extract any addresses from the body text ────────────────
+                addresses = extract_addresses(sel.get("body") or "")
+                initial_addr = addresses[0] if addresses else ""
+                st.text_input(
+                    "Delivery Address",
+                    value=initial_addr,
+                    key=f"delivery_addr_{sel_id}"
                 )
-
-                # header
-                col_widths = [1] + [4]*len(list_fields) + [1]
-                hdr = st.columns(col_widths)
-                hdr[0].markdown("**#**")
-                for i, fld in enumerate(list_fields):
-                    hdr[i+1].markdown(f"**{fld.replace('_',' ').title()}**")
-                hdr[-1].markdown("**🔍**")
-
-                # render rows
-                if "selected_email_idx" not in st.session_state:
-                    st.session_state.selected_email_idx = None
-
-                for i, row in page_df.iterrows():
-                    cols = st.columns(col_widths)
-                    cols[0].write(start + i + 1)
-                    for j, fld in enumerate(list_fields):
-                        cols[j+1].write(row.get(fld, ""))
-                    if cols[-1].button("🔍", key=f"view_{row.orig_idx}"):
-                        st.session_state.selected_email_idx = int(row.orig_idx)
-
-                # pagination controls
-                nav1, nav2, nav3 = st.columns([1,2,1])
-                if nav1.button("◀️ Prev", disabled=page == 0):
-                    st.session_state.email_page = page - 1
-                nav2.markdown(f"Page **{page+1}** of **{n_pages}**")
-                if nav3.button("Next ▶️", disabled=page >= n_pages - 1):
-                    st.session_state.email_page = page + 1
-
-                # show details & editable fields
-                sel_idx = st.session_state.selected_email_idx
-                if sel_idx is not None and 0 <= sel_idx < total:
-                    sel = email_pdf.loc[sel_idx]
-                    st.markdown("---")
-                    st.subheader(f"Details for Email #{sel_idx+1}")
-                    st.markdown(f"**Body:**  \n{sel.get('body','*(no body found)*')}")
-                    st.markdown(f"**Comment:**  \n{sel.get('comment','*(no comment found)*')}")
-
-                    # fetch parsed fields just for this message_id
-                    entry = fetch_bin_request(sel["message_id"])
-
-                    # editable inputs with initial values
-                    st.text_input(
-                        "Container Format",
-                        value=entry.get("container_format", ""),
-                        key=f"fmt_email_{sel_idx}"
-                    )
-                    st.text_input(
-                        "Quantity",
-                        value=entry.get("quantity", ""),
-                        key=f"qty_email_{sel_idx}"
-                    )
-                    st.text_input(
-                        "Date Needed",
-                        value=entry.get("date_needed", ""),
-                        key=f"date_email_{sel_idx}"
-                    )
-                    st.text_input(
-                        "Requester",
-                        value=entry.get("requester", ""),
-                        key=f"user_email_{sel_idx}"
-                    )
-                    # ── auto‑extract any addresses from the body text ────────────────
-                    addresses = extract_addresses(sel.get("body", ""))
-                    initial_addr = addresses[0] if addresses else ""
-                    st.text_input(
-                        "Delivery Address",
-                        value=initial_addr,
-                        key=f"delivery_addr_{sel_idx}"
-                    )
 
         # fall through to existing bin‑requests review UI
+            # Approve / Reject act on the checked rows, or on the opened email if none is checked
+            picked  = [r["message_id"] for r in rows if st.session_state.get(f"pick_{r['message_id']}")]
+            targets = picked or ([sel_id] if sel_id is not None else [])
+
+            def _triage(status):
+                n = mark_requests(targets, status)
+                st.session_state.triage_result = (status, n)
+                for mid in picked:
+                    st.session_state.pop(f"pick_{mid}", None)
+                st.session_state.pop("email_page", None)   # re-read statuses
+
             c1, c2, c3 = st.columns(3)
-            if c1.button("✅ Approve"):
-               # mark_request_read(mid)
-                st.success("Approved")
-            if c2.button("❌ Reject"):
-              #  mark_request_read(mid)
-                st.warning("Rejected")
+            c1.button("✅ Approve", disabled=not targets, on_click=_triage, args=("approved",))
+            c2.button("❌ Reject", disabled=not targets, on_click=_triage, args=("rejected",))
+            triage = st.session_state.pop("triage_result", None)
+            if triage and triage[0] == "approved":
+                st.success(f"Approved {triage[1]} request(s)")
+            elif triage:
+                st.warning(f"Rejected {triage[1]} request(s)")
             if c3.button("📤 Generate Proposal"):
 #                st.session_state.req_idx += 1
                 st.success("Proposal Generated")
@@ -369,59 +586,186 @@ def main():
         query = st.text_input("Your question / address:", key="chat_input")
         if st.button("Send", key="chat_send") and query:
             st.session_state.messages.append({"role": "user", "content": query})
+            st.session_state.last_citations = None
+            st.session_state.last_sql = None
     
-            # 4) Address/route override → show map
-            if handle_address_logic(query, ""):
-                # 5) If we extracted an address, fetch demographics
-                addrs = extract_addresses(query)
-                if addrs:
-                    demo = call_precisely_demographics(addrs[0])
-                    st.write(f"### Demographics for {addrs[0]}")
-                    st.json(demo)
-                # DON'T return here, so the chat history + next input remain visible
+            # 4) Dispatch: address detection and the two-tool agent run concurrently;
+            #    the extracted addresses decide the route and the other branch is discarded
+            t0        = time.perf_counter()
+            discarded = threading.Event()
+            addr_fut  = dispatch.submit(dispatch.timed, extract_addresses, query)
+            agent_fut = dispatch.submit(
+                agent_job, query, discarded, st.session_state.get("bypass_response_cache", False)
+            )
+            extracted, t_addr = addr_fut.result()
+            addrs = resolve_addresses(query, extracted)
+
+            if len(addrs) in (1, 2):
+                # address/route override → show map; the agent answer is never read
+                discarded.set()
+                agent_fut.cancel()
+                # 5) If we extracted an address, its demographics are fetched alongside
+                handle_address_logic(
+                    query, "", addrs, demographics_for=extracted[0] if extracted else None
+                )
+                total = time.perf_counter() - t0
+                record_branch_latency("address", total)
+                st.caption(f"⏱️ address detection {t_addr:.2f}s · end-to-end {total:.2f}s")
+                # DON'T return here, so the chat history + next input remain visible
             else:
-                # 6) Fire your two‑tool agent as before
-                events = snowflake_api_call(query)
-                text, sql, citations = process_sse_response(events or [])
-                did_fallback = False
-                if not sql:
-                    text = direct_completion(query)
-                    did_fallback = True
-    
+                # 6) Two‑tool agent answer, streamed as it is decoded
+                answer_slot = st.empty()
+                with st.spinner("Thinking…"):
+                    agent = agent_fut.result()
+                if agent["failed"] is not None:
+                    st.error(f"Agent HTTP error: {agent['failed'].get('status')}")
+                    st.write("🔍 Raw agent response:", agent["failed"])
+                elif agent["error"]:
+                    st.error(agent["error"])
+                stream = agent["stream"]
+                if stream is not None:
+                    text = render_answer(answer_slot, stream)
+                    sql, citations = stream.sql.strip(), stream.citations
+                    store_answer(agent["payload"], CachedAnswer(text, sql, citations))
+                else:
+                    text, sql, citations = agent["answer"] or CachedAnswer("", "", [])
+                    if text:
+                        answer_slot.markdown(f"**Assistant:** {text}")
+                timings = f"address detection {t_addr:.2f}s · agent {agent['seconds']:.2f}s"
+                if agent["cached"]:
+                    timings += " (cached)"
+                agent_stream = stream
+
+                did_fallback = agent["fallback"] is not None
+                if did_fallback:
+                    # no SQL from Analyst: the plain completion (already in flight) replaces the agent answer
+                    with st.spinner("Thinking…"):
+                        completion, t_fallback = agent["fallback"].result()
+                    stream = completion["stream"]
+                    if completion["answer"] is not None:
+                        text = completion["answer"].text
+                        answer_slot.markdown(f"**Assistant:** {text}")
+                        timings += f" · fallback {t_fallback:.2f}s (cached)"
+                    else:
+                        if completion["failed"] is not None:
+                            st.error(f"Completion HTTP error: {completion['failed'].get('status')}")
+                        text = render_answer(answer_slot, stream) if stream is not None else ""
+                        if stream is not None:
+                            store_answer(completion["payload"], CachedAnswer(text, "", []))
+                        timings += f" · fallback {t_fallback:.2f}s"
+
+                total = time.perf_counter() - t0
+                record_branch_latency("fallback" if did_fallback else "agent", total)
+                if (agent_stream is not None and agent_stream.time_to_first_token is not None
+                        and agent_stream.total_time is not None):
+                    st.caption(
+                        f"⏱️ first token after {agent_stream.time_to_first_token:.2f}s, "
+                        f"full answer after {agent_stream.total_time:.2f}s"
+                    )
+                st.caption(f"⏱️ {timings} · end-to-end {total:.2f}s")
                 if text:
                     st.session_state.messages.append({"role": "assistant", "content": text})
-                    st.markdown(f"**Assistant:** {text}")
     
                 if sql:
-                    st.markdown("### Generated SQL")
-                    st.code(sql, language="sql")
-                    df = run_snowflake_query(sql)
-                    if df is not None:
-                        st.write("### Results")
-                        st.dataframe(df)
+                    st.session_state.last_sql = {"sql": sql, "rows": GENERATED_SQL_ROW_CAP}
     
                 if not did_fallback and citations:
-                    st.write("Citations:")
-                    for c in citations:
-                        lbl    = str(c.get("source_id","source"))
-                        doc_id = c.get("doc_id","")
-                        q_sql  = (
-                            "SELECT transcript_text "
-                            "FROM sales_conversations "
-                            f"WHERE conversation_id = '{doc_id}'"
-                        )
-                        df2 = run_snowflake_query(q_sql)
-                        txt = "No transcript available"
-                        if df2 is not None:
-                            pdf2 = df2.to_pandas()
-                            if not pdf2.empty:
-                                txt = pdf2.iloc[0,0]
-                        with st.expander(lbl):
-                            st.write(txt)
+                    st.session_state.last_citations = {
+                        "answer": len(st.session_state.messages), "items": citations,
+                    }
+
+        # 6b) Generated SQL of the last agent answer, kept across reruns; results are
+        #     capped and cached, so reruns and "load more" do not run it again
+        last_sql = st.session_state.get("last_sql")
+        if last_sql:
+            st.markdown("### Generated SQL")
+            st.code(last_sql["sql"], language="sql")
+            try:
+                res = run_generated_sql(last_sql["sql"], max_rows=last_sql["rows"])
+            except Exception as e:
+                st.error(f"SQL error: {e}")
+                res = None
+            if res is not None:
+                st.write("### Results")
+                st.dataframe(res.frame)
+                note = f"{len(res.frame):,} rows in {res.seconds:.2f}s" + (" (cached)" if res.cached else "")
+                if res.truncated:
+                    st.caption(f"{note} · more rows available, capped at {last_sql['rows']:,}")
+                    if last_sql["rows"] < GENERATED_SQL_MAX_ROWS and st.button("Load more", key="sql_load_more"):
+                        last_sql["rows"] = min(last_sql["rows"] + GENERATED_SQL_ROW_CAP, GENERATED_SQL_MAX_ROWS)
+                        st.rerun()
+                else:
+                    st.caption(note)
+
+        # 7) Citations of the last agent answer, kept across reruns; a transcript is
+        #    only fetched once its expander is switched on, and then every cited
+        #    transcript comes in with the same query
+        last = st.session_state.get("last_citations")
+        if last and last["items"]:
+            st.write("Citations:")
+            cited_ids = [c.get("doc_id","") for c in last["items"]]
+            for i, c in enumerate(last["items"]):
+                lbl    = str(c.get("source_id","source"))
+                doc_id = str(c.get("doc_id",""))
+                with st.expander(lbl):
+                    if st.checkbox("Show transcript", key=f"cite_{last['answer']}_{i}"):
+                        try:
+                            txt = fetch_transcripts(cited_ids).get(doc_id, "No transcript available")
+                        except Exception as e:
+                            st.error(f"SQL error: {e}")
+                            txt = "No transcript available"
+                        st.write(txt)
+
+    # ── Sidebar: keep-alive reuse of the shared HTTP pool (HERE / Precisely)
+    http_stats = connection_stats()
+    if http_stats:
+        with st.sidebar.expander("HTTP connection reuse"):
+            st.dataframe(pd.DataFrame.from_dict(http_stats, orient="index"))
+
+    # ── Sidebar: Prospecting end-to-end latency per dispatch branch
+    if st.session_state.get("branch_latencies"):
+        with st.sidebar.expander("Prospecting latency by branch"):
+            lat = pd.DataFrame(st.session_state.branch_latencies)
+            st.dataframe(lat.groupby("branch")["seconds"].agg(["count", "mean", "max"]))
+
+    # ── Sidebar: LLM calls saved by the address-extraction memo / pre-filter
+    ex = extraction_stats()
+    if ex["calls"]:
+        st.sidebar.caption(
+            f"Address extraction: {ex['llm_calls_avoided']} of {ex['calls']} LLM calls avoided "
+            f"({ex['cache_hits']} cached, {ex['prefilter_skips']} pre-filtered)"
+        )
+
+    # ── Sidebar: agent / completion response cache
+    with st.sidebar.expander("Response cache"):
+        st.checkbox("Bypass response cache", key="bypass_response_cache")
+        rc = response_cache_stats()
+        st.caption(f"{rc['size']} answers cached · {rc['hits']} hits · {rc['misses']} misses")
+        if st.button("Clear response cache", key="clear_response_cache"):
+            invalidate_responses()
+            st.rerun()
+
+    # ── Sidebar: latency spans of this rerun
+    trace = tracing.finish_rerun()
+    with st.sidebar.expander("⏱️ Tracing"):
+        st.checkbox("Trace external calls", key="trace_enabled")
+        st.checkbox("Export spans to Snowflake", key="trace_export",
+                    disabled=not st.session_state.get("trace_enabled"))
+        if trace is not None and trace.spans:
+            render_trace(trace)
+        elif trace is not None:
+            st.caption("No external calls in this run.")
+    if trace is not None and trace.export:
+        try:
+            tracing.flush_spans(get_session())
+        except Exception as e:
+            st.sidebar.caption(f"Span export failed: {e}")
 
     # ── Sidebar: reset chat
     if st.sidebar.button("🔄 New Conversation", key="new_chat"):
         st.session_state.messages = []
+        st.session_state.last_citations = None
+        st.session_state.last_sql = None
         st.rerun()
 
 
@@ -0,0 +1,138 @@
+# table_cache.py
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from clients import get_session
+from ttl_cache import TTLCache
+import tracing
+
+
+class TableCache:
+    """
+    Two-tier cache of one value per address: an in-process TTLCache in front of
+    a Snowflake table (address_key, address, <value columns>, fetched_at).
+    lookup_many() reads the memory tier, then the table in one bound IN query;
+    store_many() writes both tiers, the table in a single MERGE from bound VALUES.
+
+    `columns` are (column, SQL expression of its bound value with {} for the
+    value), e.g. ("lat", "{}::FLOAT") or ("variables", "PARSE_JSON({})").
+    `encode(value)` gives the bound values in that order and `decode(row)`
+    rebuilds the value from a table row. `constants` are SQL literals written
+    with every store, e.g. {"provider": "'HERE'"}.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        table: str,
+        columns: Sequence[Tuple[str, str]],
+        encode: Callable[[Any], List],
+        decode: Callable[[Any], Any],
+        key: Callable[[str], str],
+        ttl: float,
+        maxsize: int,
+        constants: Optional[Dict[str, str]] = None,
+    ):
+        self.name      = name      # spans are sql.<name>_cache_lookup / sql.<name>_cache_store
+        self.table     = table
+        self.columns   = list(columns)
+        self.encode    = encode
+        self.decode    = decode
+        self.key       = key
+        self.ttl       = ttl
+        self.constants = dict(constants or {})
+        self.memory    = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.table_hits   = 0
+        self.table_misses = 0
+
+    def lookup_many(self, addresses: Iterable[str]) -> Dict[str, Any]:
+        """
+        Cached values for the given addresses, memory tier first, then one SQL
+        round-trip for everything the memory tier did not have. Addresses
+        missing from both tiers (or expired) are absent from the result.
+        """
+        found: Dict[str, Any] = {}
+        pending: Dict[str, List[str]] = {}
+        for addr in addresses:
+            key = self.key(addr)
+            hit = self.memory.get(key)
+            if hit is not None:
+                found[addr] = hit
+            else:
+                pending.setdefault(key, []).append(addr)
+
+        if not pending:
+            return found
+
+        keys = list(pending)
+        with tracing.span(f"sql.{self.name}_cache_lookup", kind="sql") as sp:
+            rows = get_session().sql(
+                f"""
+                SELECT address_key, {", ".join(col for col, _ in self.columns)},
+                       DATEDIFF('second', fetched_at, CURRENT_TIMESTAMP()) AS age_s
+                FROM {self.table}
+                WHERE address_key IN ({", ".join(["?"] * len(keys))})
+                  AND fetched_at >= DATEADD('second', -{int(self.ttl)}, CURRENT_TIMESTAMP())
+                """,
+                params=keys,
+            ).collect()
+            sp.set(rows=len(rows), cache_hit=len(rows) == len(keys))
+
+        now = time.time()
+        for row in rows:
+            value = self.decode(row)
+            self.memory.set(row["ADDRESS_KEY"], value, stored_at=now - (row["AGE_S"] or 0))
+            for addr in pending.pop(row["ADDRESS_KEY"], []):
+                found[addr] = value
+
+        self.table_hits   += len(rows)
+        self.table_misses += len(pending)
+        return found
+
+    def store_many(self, results: Dict[str, Any]) -> None:
+        """Write fresh values to both tiers; the table in a single MERGE."""
+        if not results:
+            return
+        rows: Dict[str, List] = {}
+        for addr, value in results.items():
+            key = self.key(addr)
+            self.memory.set(key, value)
+            rows[key] = [key, addr, *self.encode(value)]  # MERGE rejects duplicate source keys
+
+        width  = 2 + len(self.columns)
+        params = [v for row in rows.values() for v in row]
+        values = ", ".join(["(" + ", ".join(["?"] * width) + ")"] * len(rows))
+        source = ", ".join(
+            ["column1 AS address_key", "column2 AS address"]
+            + [f"{expr.format(f'column{i + 3}')} AS {col}" for i, (col, expr) in enumerate(self.columns)]
+        )
+        names   = [col for col, _ in self.columns]
+        updates = [f"{col} = s.{col}" for col in ["address", *names]]
+        updates += [f"{col} = {literal}" for col, literal in self.constants.items()]
+        inserts = ["address_key", "address", *names, *self.constants, "fetched_at"]
+        sources = ["s.address_key", "s.address", *(f"s.{col}" for col in names),
+                   *self.constants.values(), "CURRENT_TIMESTAMP()"]
+        with tracing.span(f"sql.{self.name}_cache_store", kind="sql") as sp:
+            get_session().sql(
+                f"""
+                MERGE INTO {self.table} t
+                USING (SELECT {source} FROM VALUES {values}) s
+                ON t.address_key = s.address_key
+                WHEN MATCHED THEN UPDATE SET
+                  {", ".join(updates)}, fetched_at = CURRENT_TIMESTAMP()
+                WHEN NOT MATCHED THEN INSERT ({", ".join(inserts)})
+                  VALUES ({", ".join(sources)})
+                """,
+                params=params,
+            ).collect()
+            sp.set(rows=len(rows))
+
+    def stats(self) -> Dict[str, int]:
+        mem = self.memory.stats()
+        return {
+            "memory_size":   mem["size"],
+            "memory_hits":   mem["hits"],
+            "memory_misses": mem["misses"],
+            "table_hits":    self.table_hits,
+            "table_misses":  self.table_misses,
+        }
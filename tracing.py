@@ -0,0 +1,229 @@
+# tracing.py
+"""
+Lightweight latency spans for external calls (Snowpark SQL, Cortex agent /
+COMPLETE, HERE, Precisely):
+
+    with tracing.span("here.geocode", kind="here") as sp:
+        resp = ...
+        sp.response(resp)
+
+Spans are collected into the Trace of the current Streamlit rerun, installed
+with start_rerun() / finish_rerun(). Without an active Trace, span() returns a
+shared no-op object, so disabled tracing costs one ContextVar lookup.
+The Trace lives in a ContextVar: work handed to thread pools must be wrapped
+with bind() (dispatch.submit does this) for its spans to join the rerun.
+"""
+import contextvars
+import itertools
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_SPANS_TABLE   = "TRACE_SPANS_WEBINAR_202508"
+EXPORT_BATCH_SIZE   = 200   # spans per INSERT
+EXPORT_MAX_DELAY    = 60    # seconds a span may wait in the buffer before a flush
+
+SPAN_COLUMNS = (
+    "rerun_id", "span_id", "parent_id", "name", "kind", "page", "started_at_us",
+    "duration_ms", "status", "bytes", "rows", "cache_hit", "thread",
+)
+
+_trace:  contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+_parent: contextvars.ContextVar = contextvars.ContextVar("trace_parent", default=None)
+_ids = itertools.count(1)
+
+_buffer: List[tuple] = []
+_buffer_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start", "end",
+                 "status", "bytes", "rows", "cache_hit", "thread", "_token")
+
+    def __init__(self, trace: "Trace", name: str, kind: str):
+        self.trace     = trace
+        self.span_id   = next(_ids)
+        self.parent_id = _parent.get()
+        self.name      = name
+        self.kind      = kind
+        self.start     = 0.0
+        self.end       = 0.0
+        self.status: Optional[str] = None
+        self.bytes: Optional[int]  = None
+        self.rows: Optional[int]   = None
+        self.cache_hit: Optional[bool] = None
+        self.thread    = threading.current_thread().name
+
+    def set(self, **attrs) -> "Span":
+        """Record any of: status, bytes, rows, cache_hit, kind."""
+        for key, value in attrs.items():
+            setattr(self, key, str(value) if key == "status" and value is not None else value)
+        return self
+
+    def response(self, resp) -> "Span":
+        """Record status code and body size of an http_client / requests response."""
+        self.status = str(resp.status_code)
+        self.bytes  = len(resp.content or b"")
+        return self
+
+    def __enter__(self) -> "Span":
+        self._token = _parent.set(self.span_id)
+        self.start  = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end = time.perf_counter()
+        _parent.reset(self._token)
+        if exc_type is not None and self.status is None:
+            self.status = f"error: {exc_type.__name__}"
+        elif self.status is None:
+            self.status = "ok"
+        self.trace.record(self)
+        return False
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end - self.start) * 1000.0
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs) -> "_NoopSpan":
+        return self
+
+    def response(self, resp) -> "_NoopSpan":
+        return self
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Trace:
+    """The spans of one Streamlit rerun."""
+
+    def __init__(self, page: str = "", export: bool = False):
+        self.rerun_id = uuid.uuid4().hex
+        self.page     = page
+        self.export   = export
+        self.started  = time.perf_counter()
+        self.wall_started = time.time()
+        self.spans: List[Span] = []
+
+    def record(self, span: Span) -> None:
+        self.spans.append(span)
+        if self.export:
+            started_us = int((self.wall_started + span.start - self.started) * 1_000_000)
+            row = (self.rerun_id, span.span_id, span.parent_id, span.name, span.kind, self.page,
+                   started_us, round(span.duration_ms, 3), span.status, span.bytes, span.rows,
+                   span.cache_hit, span.thread)
+            with _buffer_lock:
+                _buffer.append(row)
+
+    def waterfall(self) -> List[Dict[str, Any]]:
+        """Finished spans as rows with start/end offsets (ms) from the start of the rerun."""
+        return [
+            {
+                "span":     f"{s.name} #{s.span_id}",
+                "name":     s.name,
+                "kind":     s.kind,
+                "start_ms": (s.start - self.started) * 1000.0,
+                "end_ms":   (s.end - self.started) * 1000.0,
+                "duration_ms": s.duration_ms,
+                "status":   s.status,
+                "bytes":    s.bytes,
+                "rows":     s.rows,
+                "cache_hit": s.cache_hit,
+                "thread":   s.thread,
+            }
+            for s in sorted(self.spans, key=lambda s: s.start)
+        ]
+
+    def rollup(self) -> Dict[str, Dict[str, float]]:
+        """Per kind: number of calls, total ms, cache hits and bytes."""
+        out: Dict[str, Dict[str, float]] = {}
+        for s in self.spans:
+            agg = out.setdefault(s.kind, {"calls": 0, "total_ms": 0.0, "cache_hits": 0, "bytes": 0})
+            agg["calls"]      += 1
+            agg["total_ms"]   += s.duration_ms
+            agg["cache_hits"] += 1 if s.cache_hit else 0
+            agg["bytes"]      += s.bytes or 0
+        return out
+
+
+def span(name: str, kind: str = "other"):
+    """A span under the current rerun's Trace, or a no-op when tracing is off."""
+    trace = _trace.get()
+    if trace is None:
+        return _NOOP
+    return Span(trace, name, kind)
+
+
+def start_rerun(page: str = "", export: bool = False) -> Trace:
+    """Install a new Trace for the current rerun (main thread) and return it."""
+    trace = Trace(page, export)
+    _trace.set(trace)
+    return trace
+
+
+def finish_rerun() -> Optional[Trace]:
+    """Detach and return the current Trace; spans from still-running workers still land in it."""
+    trace = _trace.get()
+    _trace.set(None)
+    return trace
+
+
+def bind(fn: Callable) -> Callable:
+    """
+    fn bound to a copy of the caller's context, so a worker thread's spans join
+    this rerun. Bind once per task: a Context cannot be entered by two threads
+    at once, so one bound fn must not be shared across a pool.
+    """
+    if _trace.get() is None:
+        return fn
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def flush_spans(session, force: bool = False) -> int:
+    """
+    Write buffered spans to TRACE_SPANS_TABLE with one bound INSERT per
+    EXPORT_BATCH_SIZE rows, once the batch is full or EXPORT_MAX_DELAY has
+    passed (or `force`). Returns the number of spans written.
+    """
+    global _last_flush
+    with _buffer_lock:
+        due = force or len(_buffer) >= EXPORT_BATCH_SIZE or (
+            _buffer and time.monotonic() - _last_flush >= EXPORT_MAX_DELAY
+        )
+        if not due:
+            return 0
+        rows, _buffer[:] = list(_buffer), []
+        _last_flush = time.monotonic()
+
+    written = 0
+    placeholders = "(" + ", ".join(["?"] * len(SPAN_COLUMNS)) + ")"
+    for i in range(0, len(rows), EXPORT_BATCH_SIZE):
+        batch = rows[i:i + EXPORT_BATCH_SIZE]
+        session.sql(
+            f"""
+            INSERT INTO {TRACE_SPANS_TABLE}
+              (rerun_id, span_id, parent_id, name, kind, page, started_at,
+               duration_ms, status, bytes, rows, cache_hit, thread)
+            SELECT column1, column2, column3, column4, column5, column6,
+                   TO_TIMESTAMP_LTZ(column7, 6),
+                   column8, column9, column10, column11, column12, column13
+            FROM VALUES {", ".join([placeholders] * len(batch))}
+            """,
+            params=[v for row in batch for v in row],
+        ).collect()
+        written += len(batch)
+    return written
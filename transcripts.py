@@ -0,0 +1,48 @@
+# transcripts.py
+from typing import Dict, Iterable, Optional
+
+from clients import get_session
+from ttl_cache import TTLCache
+import tracing
+
+TRANSCRIPTS_TABLE     = "sales_conversations"
+TRANSCRIPT_CACHE_SIZE = 256   # transcripts never change, so entries only leave by LRU eviction
+
+_cache = TTLCache(maxsize=TRANSCRIPT_CACHE_SIZE)
+
+
+def fetch_transcripts(conversation_ids: Iterable[str]) -> Dict[str, str]:
+    """
+    conversation_id -> transcript_text for the given ids: cached ones from
+    memory, all the others in one bound IN query. Unknown ids are left out
+    (and not cached, in case they are loaded later).
+    """
+    found: Dict[str, str] = {}
+    missing = []
+    for cid in dict.fromkeys(str(c) for c in conversation_ids if c):
+        text = _cache.get(cid)
+        if text is None:
+            missing.append(cid)
+        else:
+            found[cid] = text
+
+    if missing:
+        with tracing.span("sql.fetch_transcripts", kind="sql") as sp:
+            rows = get_session().sql(
+                f"""
+                SELECT conversation_id, transcript_text
+                FROM {TRANSCRIPTS_TABLE}
+                WHERE conversation_id IN ({", ".join(["?"] * len(missing))})
+                """,
+                params=missing,
+            ).collect()
+            sp.set(rows=len(rows))
+        for row in rows:
+            cid, text = str(row["CONVERSATION_ID"]), row["TRANSCRIPT_TEXT"] or ""
+            _cache.set(cid, text)
+            found[cid] = text
+    return found
+
+
+def get_transcript(conversation_id: str) -> Optional[str]:
+    return fetch_transcripts([conversation_id]).get(str(conversation_id))